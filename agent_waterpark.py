@@ -1,48 +1,90 @@
+import hashlib
+import heapq
+import json
+import os
 import numpy as np
-import random
+from bisect import bisect_right
+from functools import lru_cache
 
-def quantize_state(state):
+from rng_waterpark import UniformStream
+
+def _above(x):
+    """x 초과부터 다음 구간 (digitize는 edge 이상부터 다음 구간)"""
+    return float(np.nextafter(x, np.inf))
+
+# 상태 순서 [ammonia, turbidity, pH, replace_left, hour]별 구간 경계
+# np.digitize(right=False) 기준: edges[i-1] <= x < edges[i] 이면 구간 i
+BIN_EDGES = (
+    (_above(2.8),),                                   #이거 잔류염소로 바꿀 예정
+    (_above(2.8),),                                   #탁도 2.8 이하면 0
+    (5.8, _above(8.6)),                               #pH 낮음 / 정상 / 높음
+    (_above(0), _above(5), _above(10), _above(15)),  #남은 물 교체 횟수
+    (12, 14, 17),                                     #시간 양자화 -> 아침 오후 저녁으로 다시 해야함
+)
+
+@lru_cache(maxsize=None)
+def _edge_arrays(bin_edges):
+    """searchsorted용 ndarray 경계 (bin_edges tuple마다 한 번만 변환)"""
+    return tuple(np.asarray(edges, dtype=np.float64) for edges in bin_edges)
+
+def state_shape_of(bin_edges):
+    return tuple(len(edges) + 1 for edges in bin_edges)
+
+STATE_SHAPE = state_shape_of(BIN_EDGES)
+
+def quantize_states(states, bin_edges=BIN_EDGES):
+    """
+    상태 배치를 Q_table.reshape(-1, n_actions)의 행 번호(flat index)로 변환
+
+    Returns:
+        ndarray: (N,) int flat index
+    """
+    states = np.asarray(states, dtype=np.float64).reshape(-1, 5)
+    bin_edges = _edge_arrays(bin_edges)
+    # ravel_multi_index와 같은 C-order flat index를 차원별로 누적
+    index = np.searchsorted(bin_edges[0], states[:, 0], side='right')
+    for dim in range(1, 4):
+        index = index * (len(bin_edges[dim]) + 1) + np.searchsorted(bin_edges[dim], states[:, dim], side='right')
+    hours = 9 + (states[:, 4].astype(np.int64) * 10) // 60
+    return index * (len(bin_edges[4]) + 1) + np.searchsorted(bin_edges[4], hours, side='right')
+
+def quantize_state(state, bin_edges=BIN_EDGES):
+    """상태 하나를 Q_table 인덱스 tuple로 변환 (quantize_states와 같은 구간, 스칼라용)"""
     ammonia, turbidity, ph, replace_left, current_step = state
-    if ph < 5.8: #pH 낮음
-        ph_state = 0
-    elif ph > 8.6: #pH 높음
-        ph_state = 2
-    else: #pH 정상
-        ph_state = 1
-        
-    #탁도 2.8 이하면 0
-    turbidity_state = 0 if turbidity <= 2.8 else 1
-    #이거 잔류염소로 바꿀 예정
-    ammonia_state = 0 if ammonia <= 2.8 else 1
-    
-    #이건 뭐지(물 교체 횟수)
-    if replace_left == 0:
-        replace_state = 0
-    elif replace_left <= 5:
-        replace_state = 1
-    elif replace_left <= 10:
-        replace_state = 2
-    elif replace_left <= 15:
-        replace_state = 3
-    else:
-        replace_state = 4
-        
-    #시간 양자화 -> 아침 오후 저녁으로 다시 해야함
     hour = 9 + (int(current_step) * 10) // 60
-    if 9 <= hour < 12:
-        time_state = 0
-    elif 12 <= hour < 14:
-        time_state = 1
-    elif 14 <= hour < 17:
-        time_state = 2
-    else:
-        time_state = 3
-        
-    return (ammonia_state, turbidity_state, ph_state, replace_state, time_state)
+    return (bisect_right(bin_edges[0], ammonia),
+            bisect_right(bin_edges[1], turbidity),
+            bisect_right(bin_edges[2], ph),
+            bisect_right(bin_edges[3], replace_left),
+            bisect_right(bin_edges[4], hour))
+
+def decayed_epsilon(epsilon, epsilon_decay, epsilon_min):
+    """에피소드 한 번의 epsilon 감소 (epsilon_min보다 크면 곱하고 epsilon_min 아래로는 내려가지 않음)"""
+    if epsilon > epsilon_min:
+        epsilon *= epsilon_decay
+        if epsilon < epsilon_min:
+            epsilon = epsilon_min
+    return epsilon
 
 class QAgent:
-    def __init__(self, state_shape=(2,2,3,5,4), n_actions=2, alpha=0.1, gamma=0.95, epsilon=0.1, epsilon_decay=0.0, epsilon_min=0.01):
-        self.state_shape = state_shape
+    """
+    planning_steps > 0이면 Dyna-Q/prioritized sweeping 모드:
+    (상태, 행동) -> (보상 합, 횟수, 다음 상태별 횟수) 모델을 배우고,
+    실제 step마다 TD 오차가 큰 순서대로 planning_steps번의 모델 기반 업데이트를 추가로 수행.
+    """
+    def __init__(self, state_shape=None, n_actions=2, alpha=0.1, gamma=0.95, epsilon=0.1, epsilon_decay=0.0, epsilon_min=0.01, seed=None, bin_edges=BIN_EDGES,
+                 planning_steps=0, priority_threshold=1e-4):
+        """
+        Args:
+            state_shape (tuple): Q_table 상태 차원 (None이면 bin_edges로 계산, 주면 bin_edges와 맞는지 확인)
+            bin_edges (tuple): 차원별 구간 경계 (quantize_state / greedy_policy가 같은 경계 사용)
+        """
+        expected = state_shape_of(bin_edges)
+        if state_shape is not None and tuple(state_shape) != expected:
+            raise ValueError(f"state_shape {tuple(state_shape)}가 bin_edges의 구간 수 {expected}와 다름")
+        self.state_shape = state_shape = expected
+        self.bin_edges = bin_edges  #Q_table 해석용 (체크포인트에 함께 저장)
+        self.episodes = 0  #학습한 에피소드 수
         self.n_actions = n_actions
         self.Q_table = np.zeros(state_shape + (n_actions,))
         self.alpha = alpha
@@ -50,31 +92,389 @@ class QAgent:
         self.epsilon = epsilon
         self.epsilon_decay = epsilon_decay
         self.epsilon_min = epsilon_min  #나중에 빼도 됨
+        self.rng = UniformStream(seed)  #에이전트 전용 난수 스트림 (epsilon 탐험용)
+        self.planning_steps = planning_steps
+        self.priority_threshold = priority_threshold
+        self._set_planning_state(None)
+
+    def _set_planning_state(self, state):
+        """planning 모델/우선순위 큐 초기화 (state: _planning_state 결과면 그 상태로 복원)"""
+        self.model = {}         #(상태, 행동) -> [보상 합, 횟수, {다음 상태: 횟수}]
+        self.predecessors = {}  #다음 상태 -> {(상태, 행동)}
+        self._queue = []        #(-우선순위, 순번, (상태, 행동)) 최대 힙
+        self._queued = {}       #(상태, 행동) -> 큐에 있는 최신 우선순위 (오래된 항목은 pop 때 무시)
+        self._pushes = 0
+        self._values = {}       #상태 -> max Q 캐시 (planning 중 Q_table 갱신 시 무효화)
+        if state is None:
+            return
+        for key, reward_sum, count, next_counts in state['model']:
+            key = tuple(key)
+            self.model[key] = [reward_sum, count, {tuple(next_state): n for next_state, n in next_counts}]
+            for next_state, _ in next_counts:
+                self.predecessors.setdefault(tuple(next_state), set()).add(key)
+        self._queue = [(priority, order, tuple(key)) for priority, order, key in state['queue']]  #저장한 힙 순서 그대로
+        self._queued = {tuple(key): priority for key, priority in state['queued']}
+        self._pushes = state['pushes']
+
+    def _planning_state(self):
+        # JSON 저장용 (numpy 정수 -> int)
+        return {
+            'model': [[[int(v) for v in key], reward_sum, count, [[[int(v) for v in next_state], n] for next_state, n in next_counts.items()]]
+                      for key, (reward_sum, count, next_counts) in self.model.items()],
+            'queue': [[priority, order, [int(v) for v in key]] for priority, order, key in self._queue],
+            'queued': [[[int(v) for v in key], priority] for key, priority in self._queued.items()],
+            'pushes': self._pushes,
+        }
+
+    def quantize_state(self, state):
+        """학습 루프용: 원본 상태 -> 이 에이전트의 bin_edges 기준 Q_table 인덱스"""
+        return quantize_state(state, self.bin_edges)
 
     def choose_action(self, state):
-        if np.random.rand() < self.epsilon:
-            return np.random.randint(self.n_actions)
+        if self.rng.random() < self.epsilon:
+            return self.rng.integers(self.n_actions)
         return np.argmax(self.Q_table[state])
 
-    def learn(self, state, action, reward, next_state):
+    def learn(self, state, action, reward, next_state, planning_steps=None):
+        """
+        Args:
+            planning_steps (int): 이번 호출의 모델 기반 업데이트 횟수 (None이면 self.planning_steps)
+        """
         best_next = np.max(self.Q_table[next_state])
         td_target = reward + self.gamma * best_next
         td_error = td_target - self.Q_table[state + (action,)]
         self.Q_table[state + (action,)] += self.alpha * td_error
+        if self._values:
+            self._values.pop(state, None)
+
+        if planning_steps is None:
+            planning_steps = self.planning_steps
+        if planning_steps > 0:
+            self._update_model(state, action, reward, next_state)
+            self._push(state + (action,), abs(td_error))
+            self.plan(planning_steps)
+
+    def _update_model(self, state, action, reward, next_state):
+        key = state + (action,)
+        entry = self.model.get(key)
+        if entry is None:
+            entry = self.model[key] = [0.0, 0, {}]
+        entry[0] += reward
+        entry[1] += 1
+        entry[2][next_state] = entry[2].get(next_state, 0) + 1
+        self.predecessors.setdefault(next_state, set()).add(key)
+
+    def _model_target(self, key):
+        # 모델의 평균 보상 + 다음 상태 분포에 대한 기대 최대 Q
+        reward_sum, count, next_counts = self.model[key]
+        values = self._values
+        expected = 0.0
+        for next_state, n in next_counts.items():
+            value = values.get(next_state)
+            if value is None:
+                value = values[next_state] = float(self.Q_table[next_state].max())
+            expected += n * value
+        return (reward_sum + self.gamma * expected) / count
+
+    def _push(self, key, priority):
+        if priority > self.priority_threshold and priority > self._queued.get(key, 0.0):
+            self._queued[key] = priority
+            self._pushes += 1
+            heapq.heappush(self._queue, (-priority, self._pushes, key))
+
+    def plan(self, n_steps):
+        """우선순위 큐에서 TD 오차가 큰 (상태, 행동)부터 n_steps번 모델 기반 업데이트"""
+        queue, queued = self._queue, self._queued
+        done = 0
+        while queue and done < n_steps:
+            priority, _, key = heapq.heappop(queue)
+            if queued.get(key) != -priority:
+                continue  #더 높은 우선순위로 다시 들어간 오래된 항목
+            del queued[key]
+            done += 1
+            self.Q_table[key] += self.alpha * (self._model_target(key) - self.Q_table[key])
+            state = key[:-1]
+            self._values.pop(state, None)
+            # state로 들어오는 (상태, 행동)의 우선순위 갱신
+            for pred in self.predecessors.get(state, ()):
+                self._push(pred, abs(self._model_target(pred) - self.Q_table[pred]))
+
+    def decay_epsilon(self):
+        self.epsilon = decayed_epsilon(self.epsilon, self.epsilon_decay, self.epsilon_min)
+
+    def end_episode(self):
+        """에피소드 종료 처리 (학습 루프가 매 에피소드 끝에 호출, QAgent는 할 일 없음)"""
+
+    def save(self, path):
+        """
+        체크포인트 저장: path.npy (Q_table) + path.json (메타데이터)
+        + planning 모델이 있으면 path.model.json (모델/우선순위 큐)
+        임시 파일에 쓴 뒤 교체하므로 저장 중 중단돼도 이전 체크포인트는 유지됨.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path + '.npy.tmp', 'wb') as f:
+            np.save(f, np.ascontiguousarray(self.Q_table))
+        if self.model:
+            with open(path + '.model.json.tmp', 'w') as f:
+                json.dump(self._planning_state(), f)
+        meta = {
+            'state_shape': list(self.state_shape),
+            'n_actions': self.n_actions,
+            'bin_edges': [list(edges) for edges in self.bin_edges],
+            'alpha': self.alpha,
+            'gamma': self.gamma,
+            'epsilon': self.epsilon,
+            'epsilon_decay': self.epsilon_decay,
+            'epsilon_min': self.epsilon_min,
+            'episodes': self.episodes,
+            'rng': self.rng.get_state(),
+            'planning_steps': self.planning_steps,
+            'priority_threshold': self.priority_threshold,
+        }
+        with open(path + '.json.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + '.npy.tmp', path + '.npy')
+        if self.model:
+            os.replace(path + '.model.json.tmp', path + '.model.json')
+        elif os.path.exists(path + '.model.json'):
+            os.remove(path + '.model.json')  #이전 저장의 모델이 남지 않도록
+        os.replace(path + '.json.tmp', path + '.json')
+
+    def restore(self, path, mmap_mode=None):
+        """
+        체크포인트를 현재 에이전트에 불러옴 (planning 모델/큐도 저장된 것으로 교체, 없으면 비움)
+
+        Args:
+            path (str): save에 넘긴 경로 (확장자 제외)
+            mmap_mode (str): None이면 메모리로 복사, 'r'이면 읽기 전용 memory-map (평가용, planning 모델은 읽지 않음)
+        """
+        with open(path + '.json') as f:
+            meta = json.load(f)
+        self.Q_table = np.load(path + '.npy', mmap_mode=mmap_mode)
+        self.state_shape = tuple(meta['state_shape'])
+        self.n_actions = meta['n_actions']
+        self.bin_edges = tuple(tuple(edges) for edges in meta['bin_edges'])
+        for key in ('alpha', 'gamma', 'epsilon', 'epsilon_decay', 'epsilon_min', 'episodes'):
+            setattr(self, key, meta[key])
+        self.planning_steps = meta.get('planning_steps', self.planning_steps)
+        self.priority_threshold = meta.get('priority_threshold', self.priority_threshold)
+        self.rng.set_state(meta['rng'])
+        planning = None
+        if mmap_mode is None and os.path.exists(path + '.model.json'):
+            with open(path + '.model.json') as f:
+                planning = json.load(f)
+        self._set_planning_state(planning)  #이전 Q_table 기준 모델/큐/_values 캐시는 버림
+        return self
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        return cls().restore(path, mmap_mode)
+
+    def q_snapshot(self):
+        """
+        수렴 판정용 Q 값 복사본 (SparseQAgent / LinearQAgent도 같은 형식으로 제공)
+
+        Returns:
+            (keys, values): keys는 values 행의 셀 번호 (오름차순, None이면 행 번호 그대로), values는 (셀 수, n_actions)
+        """
+        return None, np.array(self.Q_table, copy=True).reshape(-1, self.n_actions)
+
+    def greedy_policy(self):
+        """현재 Q_table을 고정한 CompiledGreedyPolicy (평가/서빙용)"""
+        return CompiledGreedyPolicy.from_q_table(self.Q_table, self.bin_edges)
+
+class QLambdaAgent(QAgent):
+    """
+    Watkins Q(lambda). 방문한 (상태, 행동)의 eligibility trace만 dict로 보관(sparse).
+    탐험(그리디가 아닌) 행동을 고르면 trace 초기화, 에피소드 종료(end_episode 호출) 시에도 초기화.
+    train_qlearning_full / train_qlearning에 QAgent 대신 그대로 넣어서 사용.
+    planning(Dyna) 모드는 지원하지 않음 (planning_steps > 0이면 ValueError).
+    """
+    def __init__(self, *args, lam=0.8, trace_min=1e-3, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.planning_steps:
+            raise ValueError("QLambdaAgent는 planning_steps(Dyna)를 지원하지 않음")
+        self.lam = lam
+        self.trace_min = trace_min  #이보다 작아진 trace는 삭제
+        self.traces = {}
+
+    def choose_action(self, state):
+        if self.rng.random() < self.epsilon:
+            action = self.rng.integers(self.n_actions)
+            if action != np.argmax(self.Q_table[state]):
+                self.traces.clear()
+            return action
+        return np.argmax(self.Q_table[state])
+
+    def learn(self, state, action, reward, next_state, planning_steps=None):
+        if planning_steps:
+            raise ValueError("QLambdaAgent는 planning_steps(Dyna)를 지원하지 않음")
+        Q = self.Q_table
+        key = state + (action,)
+        td_error = reward + self.gamma * np.max(Q[next_state]) - Q[key]
+        traces = self.traces
+        traces[key] = 1.0  #replacing trace
+        step = self.alpha * td_error
+        decay = self.gamma * self.lam
+        for trace_key, trace in list(traces.items()):
+            Q[trace_key] += step * trace
+            trace *= decay
+            if trace < self.trace_min:
+                del traces[trace_key]
+            else:
+                traces[trace_key] = trace
+
+    def reset_traces(self):
+        self.traces.clear()
+
+    def end_episode(self):
+        self.reset_traces()  #에피소드 경계
+
+    def restore(self, path, mmap_mode=None):
+        super().restore(path, mmap_mode)
+        self.reset_traces()  #이전 Q_table 기준 trace는 버림
+        return self
+
+class BatchedQAgent:
+    """
+    독립된 QAgent K개를 하나의 텐서로 학습 (시드별 신뢰구간용).
+    Q_table: (K,) + state_shape + (n_actions,), 상태는 quantize_states의 flat index 사용.
+    """
+    def __init__(self, n_agents, state_shape=STATE_SHAPE, n_actions=2, alpha=0.1, gamma=0.95, epsilon=0.1, epsilon_decay=0.0, epsilon_min=0.01, seed=None):
+        self.n_agents = n_agents
+        self.state_shape = state_shape
+        self.n_actions = n_actions
+        self.Q_table = np.zeros((n_agents,) + state_shape + (n_actions,))
+        # (K, 상태 수, n_actions) view
+        self.Q_flat = self.Q_table.reshape(n_agents, -1, n_actions)
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.epsilon_decay = epsilon_decay
+        self.epsilon_min = epsilon_min
+        self.rng = np.random.default_rng(seed)
+        self._agents = np.arange(n_agents)
+
+    def _agent_index(self, states):
+        # states가 (K,) 또는 (K, M)일 때 에이전트 번호를 같은 모양으로
+        if states.ndim == 1:
+            return self._agents
+        shape = (self.n_agents,) + (1,) * (states.ndim - 1)
+        return np.broadcast_to(self._agents.reshape(shape), states.shape)
+
+    def choose_action(self, states):
+        """
+        Args:
+            states (ndarray): (K,) 또는 (K, M) flat 상태 index
+
+        Returns:
+            ndarray: states와 같은 모양의 행동
+        """
+        states = np.asarray(states)
+        agents = self._agent_index(states)
+        actions = np.argmax(self.Q_flat[agents, states], axis=-1)
+        explore = self.rng.random(states.shape) < self.epsilon
+        if explore.any():
+            actions[explore] = self.rng.integers(self.n_actions, size=int(np.count_nonzero(explore)))
+        return actions
+
+    def learn(self, states, actions, rewards, next_states):
+        """같은 (에이전트, 상태, 행동)이 여러 번 나오면 np.add.at으로 모두 누적"""
+        states = np.asarray(states)
+        agents = self._agent_index(states)
+        best_next = np.max(self.Q_flat[agents, next_states], axis=-1)
+        td_target = rewards + self.gamma * best_next
+        td_error = td_target - self.Q_flat[agents, states, actions]
+        np.add.at(self.Q_flat, (agents, states, actions), self.alpha * td_error)
 
     def decay_epsilon(self):
-        if self.epsilon > self.epsilon_min:
-            self.epsilon *= self.epsilon_decay
-            if self.epsilon < self.epsilon_min:
-                self.epsilon = self.epsilon_min
+        self.epsilon = decayed_epsilon(self.epsilon, self.epsilon_decay, self.epsilon_min)
+
+    def agent(self, k):
+        """k번째 Q-table을 가진 QAgent (평가용, Q_table은 복사)"""
+        q_agent = QAgent(self.state_shape, self.n_actions, self.alpha, self.gamma, 0.0, self.epsilon_decay, self.epsilon_min)
+        q_agent.Q_table = self.Q_table[k].copy()
+        return q_agent
+
+class CompiledGreedyPolicy:
+    """
+    Q_table을 argmax 행동 배열(int8, 상태 flat index 순서)로 고정한 그리디 정책.
+    choose_action은 quantize_state 결과(tuple), choose_actions는 원본 상태 배치를 받음.
+    평가 루프는 policy.quantize_state로 양자화 (학습한 에이전트의 bin_edges 사용).
+    """
+    deterministic = True
+
+    def __init__(self, actions, state_shape=STATE_SHAPE, bin_edges=BIN_EDGES):
+        self.actions = np.ascontiguousarray(actions, dtype=np.int8).reshape(-1)
+        self.state_shape = state_shape
+        self.bin_edges = bin_edges
+        # tuple -> flat index 계산용 stride와 float 없는 행동 리스트 (스칼라 경로)
+        strides, stride = [], 1
+        for size in reversed(self.state_shape):
+            strides.append(stride)
+            stride *= size
+        self._strides = tuple(reversed(strides))
+        self._action_list = self.actions.tolist()
+
+    @classmethod
+    def from_q_table(cls, q_table, bin_edges=BIN_EDGES):
+        q_table = np.asarray(q_table)
+        actions = np.argmax(q_table.reshape(-1, q_table.shape[-1]), axis=1)
+        return cls(actions, q_table.shape[:-1], bin_edges)
+
+    def quantize_state(self, state):
+        """원본 상태 -> 이 정책의 bin_edges 기준 인덱스 tuple (choose_action 입력)"""
+        return quantize_state(state, self.bin_edges)
+
+    def choose_action(self, state):
+        index = 0
+        for value, stride in zip(state, self._strides):
+            index += value * stride
+        return self._action_list[index]
+
+    def choose_actions(self, states):
+        """
+        Args:
+            states (ndarray): (N, 5) 원본 상태
+
+        Returns:
+            ndarray: (N,) int8 행동
+        """
+        return self.actions[quantize_states(states, self.bin_edges)]
+
+    def cache_key(self):
+        meta = str((self.state_shape, tuple(tuple(float(e) for e in edges) for edges in self.bin_edges))).encode()
+        return 'CompiledGreedyPolicy:' + hashlib.sha1(self.actions.tobytes() + meta).hexdigest()
 
 class FixedIntervalPolicy:
+    deterministic = True  #같은 상태 -> 항상 같은 행동 (평가 캐시 가능)
+
+    def cache_key(self):
+        return 'FixedIntervalPolicy'
+
     def choose_action(self, state):
         _, _, _, replace_left, current_step = state
         if replace_left > 0 and int(current_step) % 3 == 0:
             return 1
         return 0
 
+class SchedulePolicy:
+    """고정 환경용: 스텝별로 정해진 행동 순서(solve_optimal 결과 등)를 그대로 실행"""
+    deterministic = True
+
+    def __init__(self, schedule):
+        self.schedule = schedule
+
+    def cache_key(self):
+        return 'SchedulePolicy:' + hashlib.sha1(np.asarray(self.schedule, dtype=np.int8).tobytes()).hexdigest()
+
+    def choose_action(self, state):
+        current_step = int(state[4])
+        return self.schedule[min(current_step, len(self.schedule) - 1)]
+
 class RandomPolicy:
+    def __init__(self, seed=None):
+        self.rng = UniformStream(seed)
+
     def choose_action(self, state):
-        return random.choice([0, 1])
+        return self.rng.integers(2)
@@ -0,0 +1,197 @@
+"""
+환경/에이전트/학습 루프 처리량 벤치마크.
+
+사용법:
+    python benchmarks/run_benchmarks.py                      # 측정 후 results.json 저장, baseline.json과 비교
+    python benchmarks/run_benchmarks.py --save-baseline      # 현재 결과를 baseline.json으로 저장
+    python benchmarks/run_benchmarks.py --threshold 0.2      # 20% 이상 느려지면 실패(exit 1)
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from env_waterpark import WaterParkEnv  # noqa: E402
+from env_waterpark_fixed import WaterParkEnv as FixedWaterParkEnv  # noqa: E402
+from agent_waterpark import QAgent, FixedIntervalPolicy, quantize_state  # noqa: E402
+from train_waterpark import run_policy_full, train_qlearning_full  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_PATH = os.path.join(ROOT, "fixed_env_changes2.csv")
+
+
+def bench_env_step(n_steps=60000):
+    env = WaterParkEnv(return_info=False, seed=0)
+    buf = np.empty(5)
+    actions = np.random.default_rng(0).integers(0, 2, n_steps).tolist()
+    env.reset(out=buf)
+    for action in actions:
+        _, _, done, _ = env.step(action, out=buf)
+        if done:
+            env.reset(out=buf)
+    return n_steps, 'steps'
+
+
+def bench_env_fixed_step(n_steps=60000):
+    env = FixedWaterParkEnv(CSV_PATH, return_info=False)
+    buf = np.empty(5)
+    actions = np.random.default_rng(0).integers(0, 2, n_steps).tolist()
+    env.reset(out=buf)
+    for action in actions:
+        _, _, done, _ = env.step(action, out=buf)
+        if done:
+            env.reset(out=buf)
+    return n_steps, 'steps'
+
+
+def bench_quantize_state(n_states=60000):
+    rng = np.random.default_rng(0)
+    states = np.column_stack([
+        rng.uniform(0, 5, n_states), rng.uniform(0, 5, n_states), rng.uniform(4, 10, n_states),
+        rng.integers(0, 21, n_states), rng.integers(0, 60, n_states),
+    ]).tolist()
+    for state in states:
+        quantize_state(state)
+    return n_states, 'states'
+
+
+def bench_qagent_learn(n_updates=60000):
+    agent = QAgent(seed=0)
+    rng = np.random.default_rng(0)
+    states = [tuple(s) for s in rng.integers(0, agent.state_shape, (n_updates, len(agent.state_shape))).tolist()]
+    actions = rng.integers(0, 2, n_updates).tolist()
+    rewards = rng.normal(size=n_updates).tolist()
+    for i in range(n_updates - 1):
+        agent.learn(states[i], actions[i], rewards[i], states[i + 1])
+    return n_updates - 1, 'updates'
+
+
+def bench_run_policy_full(episodes=500):
+    env = WaterParkEnv(return_info=False, seed=0)
+    run_policy_full(env, FixedIntervalPolicy(), quantize=False, episodes=episodes)
+    return episodes, 'episodes'
+
+
+def bench_train_qlearning_full(episodes=500):
+    env = WaterParkEnv(return_info=False, seed=0)
+    agent = QAgent(epsilon=0.1, epsilon_decay=0.9995, epsilon_min=0.001, seed=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        train_qlearning_full(env, agent, episodes=episodes)
+    return episodes, 'episodes'
+
+
+BENCHMARKS = {
+    'env_step': bench_env_step,
+    'env_fixed_step': bench_env_fixed_step,
+    'quantize_state': bench_quantize_state,
+    'qagent_learn': bench_qagent_learn,
+    'run_policy_full': bench_run_policy_full,
+    'train_qlearning_full': bench_train_qlearning_full,
+}
+
+
+def measure(fn, repeat):
+    """repeat번 중 가장 빠른 시간으로 처리량 계산, 피크 메모리는 별도 1회 측정"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count, unit = fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'unit': unit,
+        'count': count,
+        'seconds': best,
+        'per_sec': count / best,
+        'peak_memory_kb': peak / 1024,
+    }
+
+
+def run_benchmarks(names=None, repeat=3):
+    results = {}
+    for name in names or BENCHMARKS:
+        results[name] = measure(BENCHMARKS[name], repeat)
+        r = results[name]
+        print(f"{name:<22}{r['per_sec']:>14,.0f} {r['unit']}/sec{r['peak_memory_kb']:>12,.1f} KB peak")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    baseline 대비 처리량이 threshold 비율 이상 떨어진 항목 목록
+
+    Returns:
+        list: 회귀한 벤치마크 이름
+    """
+    regressions = []
+    print(f"\n{'benchmark':<22}{'baseline':>14}{'current':>14}{'change':>9}")
+    for name, r in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]['per_sec']
+        change = r['per_sec'] / base - 1
+        flag = ''
+        if change < -threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<22}{base:>14,.0f}{r['per_sec']:>14,.0f}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WaterPark 처리량 벤치마크")
+    parser.add_argument('names', nargs='*', help=f"실행할 벤치마크 (기본: 전체) {list(BENCHMARKS)}")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'results.json'))
+    parser.add_argument('--baseline', default=os.path.join(BENCH_DIR, 'baseline.json'))
+    parser.add_argument('--threshold', type=float, default=0.1, help="허용 처리량 감소 비율")
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true', help="기준(--baseline)이 없으면 실패 (회귀 검사용)")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"알 수 없는 벤치마크: {', '.join(unknown)}")
+
+    results = run_benchmarks(args.names, args.repeat)
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+    path = args.baseline if args.save_baseline else args.output
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n저장: {path}")
+
+    if args.save_baseline:
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\n경고: 기준 파일 없음 ({args.baseline}) -> 회귀 비교 안 함 (--save-baseline으로 먼저 저장)")
+        return 2 if args.check else 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n회귀 발견 ({args.threshold:.0%} 초과 감소): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import numpy as np
+
+
+def _q_snapshot(agent):
+    if not hasattr(agent, 'q_snapshot'):
+        raise TypeError(f"ConvergenceMonitor는 q_snapshot()이 있는 에이전트만 지원 ({type(agent).__name__})")
+    return agent.q_snapshot()
+
+
+class ConvergenceMonitor:
+    """
+    학습 수렴 판정기 (조기 종료용).
+    window 에피소드마다 직전 window 시점의 Q 값(agent.q_snapshot)과 비교해서
+      - Q 값 변화량의 최대/평균 (절댓값)
+      - 그리디 행동이 바뀐 상태 비율
+      - 이동 평균 보상의 변화량
+    을 계산하고, 모두 허용 오차 이내인 window가 patience번 연속되면 수렴으로 판정.
+
+    사용 (학습 루프가 첫 에피소드 전에 start(agent)를 호출 -> 첫 window도 초기 Q 값과 비교):
+        monitor = ConvergenceMonitor(window=100)
+        train_qlearning_full(env, agent, episodes=10000, convergence=monitor)
+        monitor.converged_episode   # 수렴한 에피소드 (agent.episodes 기준, resume해도 학습 루프 출력과 같음 / 수렴 안 했으면 None)
+    """
+
+    def __init__(self, window=100, max_delta_tol=1.0, mean_delta_tol=0.01,
+                 policy_change_tol=0.01, reward_tol=0.5, patience=3, min_episodes=0):
+        """
+        Args:
+            window (int): 비교 주기 (에피소드 수)
+            max_delta_tol (float): window 동안 Q 값 변화량 최댓값 허용치
+            mean_delta_tol (float): window 동안 Q 값 변화량 평균 허용치
+            policy_change_tol (float): 그리디 행동이 바뀐 상태 비율 허용치 (0이면 하나도 안 바뀌어야 함)
+            reward_tol (float): window 평균 보상의 직전 window 대비 변화량 허용치
+            patience (int): 연속으로 만족해야 하는 window 수
+            min_episodes (int): 이 에피소드 수 이전에는 수렴 판정 안 함 (agent.episodes 기준)
+        """
+        self.window = window
+        self.max_delta_tol = max_delta_tol
+        self.mean_delta_tol = mean_delta_tol
+        self.policy_change_tol = policy_change_tol
+        self.reward_tol = reward_tol
+        self.patience = patience
+        self.min_episodes = min_episodes
+        self.history = []  # window별 지표 dict
+        self.converged_episode = None
+        self._episodes = 0        # 모니터 시작 이후 에피소드 수 (window 계산용)
+        self._start_episode = 0   # 시작 시점의 agent.episodes (resume이면 0이 아님)
+        self._streak = 0
+        self._reward_sum = 0.0
+        self._last_reward = None
+        self._last_keys = None
+        self._last_q = None
+        self._last_greedy = None
+
+    @property
+    def converged(self):
+        return self.converged_episode is not None
+
+    def start(self, agent):
+        """학습 시작 전 (resume이면 불러온 뒤) 기준 Q 값과 에피소드 번호 저장"""
+        self._snapshot(*_q_snapshot(agent))
+        self._start_episode = getattr(agent, 'episodes', 0)
+
+    def update(self, agent, reward):
+        """
+        에피소드 종료 시 호출
+
+        Args:
+            agent: q_snapshot()을 가진 에이전트 (QAgent / SparseQAgent / LinearQAgent)
+            reward (float): 에피소드 총 보상
+
+        Returns:
+            bool: 수렴했으면 True (학습 중단)
+        """
+        if self._last_q is None:
+            # start 없이 호출된 경우 (첫 window는 첫 에피소드 이후와 비교, 학습 루프는 이미 agent.episodes를 올린 뒤)
+            self.start(agent)
+            self._start_episode = max(self._start_episode - 1, 0)
+        self._episodes += 1
+        self._reward_sum += float(reward)
+        if self._episodes % self.window:
+            return False
+
+        keys, q = _q_snapshot(agent)
+        last_q, last_greedy = self._aligned(keys, len(q))
+        delta = np.abs(q - last_q)
+        greedy = np.argmax(q, axis=-1)
+        mean_reward = self._reward_sum / self.window
+        stats = {
+            'episode': self._start_episode + self._episodes,
+            'max_delta': float(delta.max()) if delta.size else 0.0,
+            'mean_delta': float(delta.mean()) if delta.size else 0.0,
+            'policy_change': float(np.mean(greedy != last_greedy)) if len(greedy) else 0.0,
+            'reward_mean': mean_reward,
+            'reward_change': abs(mean_reward - self._last_reward) if self._last_reward is not None else float('inf'),
+        }
+        self.history.append(stats)
+        self._snapshot(keys, q)
+        self._last_reward = mean_reward
+        self._reward_sum = 0.0
+
+        within = (stats['max_delta'] <= self.max_delta_tol
+                  and stats['mean_delta'] <= self.mean_delta_tol
+                  and stats['policy_change'] <= self.policy_change_tol
+                  and stats['reward_change'] <= self.reward_tol)
+        self._streak = self._streak + 1 if within else 0
+        if self._streak >= self.patience and self._start_episode + self._episodes >= self.min_episodes:
+            self.converged_episode = self._start_episode + self._episodes
+            return True
+        return False
+
+    def _snapshot(self, keys, q):
+        self._last_keys = keys
+        self._last_q = q
+        self._last_greedy = np.argmax(q, axis=-1)
+
+    def _aligned(self, keys, n):
+        # 직전 스냅샷을 현재 셀 순서로 맞춤 (sparse: 새로 방문한 상태는 초기값 0, 그리디 행동 0)
+        if keys is None:
+            return self._last_q, self._last_greedy
+        last_q = np.zeros((n, self._last_q.shape[1]))
+        last_greedy = np.zeros(n, dtype=self._last_greedy.dtype)
+        if len(self._last_keys):
+            pos = np.searchsorted(self._last_keys, keys).clip(max=len(self._last_keys) - 1)
+            found = self._last_keys[pos] == keys
+            last_q[found] = self._last_q[pos[found]]
+            last_greedy[found] = self._last_greedy[pos[found]]
+        return last_q, last_greedy
+
+    def summary(self):
+        last = self.history[-1] if self.history else {}
+        return {'converged_episode': self.converged_episode, 'episodes': self._episodes, **last}
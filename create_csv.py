@@ -1,25 +1,22 @@
-import csv
+import argparse
 
-# 시간대별 정보
-influx_per_time = [166, 83, 277, 83]
-max_ph_change, max_turbidity_change, max_ammonia_change = 3.5, 3.0, 1.0
-max_influx = max(influx_per_time)
+from scenario_waterpark import BASE_INFLUX, MAX_CHANGES, STEPS_PER_TIME, generate_bank, profile_trace, write_trace_csv
 
-# 시간대별 변화값 산정
-ph_changes = [round(max_ph_change * (i / max_influx), 2) for i in influx_per_time]
-turbidity_changes = [round(max_turbidity_change * (i / max_influx), 2) for i in influx_per_time]
-ammonia_changes = [round(max_ammonia_change * (i / max_influx), 2) for i in influx_per_time]
-steps_per_time = [18, 12, 18, 12]  # 각 시간대별 스텝 수
+# 기본: 기준 프로필 하나를 fixed_env_changes2.csv로 저장
+# --bank: 분포에서 뽑은 시나리오 여러 개를 (scenarios, steps, 3) .npy 뱅크 하나로 저장 (scenario_waterpark.generate_bank)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="고정 환경 변화량 CSV / 시나리오 뱅크 생성")
+    parser.add_argument('--influx', type=int, nargs=len(STEPS_PER_TIME), default=list(BASE_INFLUX), help="시간대별 유입 인원")
+    parser.add_argument('--max-changes', type=float, nargs=3, default=list(MAX_CHANGES),
+                        help="최대 유입일 때 스텝당 변화량 [ammonia, turbidity, pH]")
+    parser.add_argument('--out', default='fixed_env_changes2.csv')
+    parser.add_argument('--bank', default=None, help="지정하면 CSV 대신 이 경로(.npy)에 시나리오 뱅크 생성")
+    parser.add_argument('--n', type=int, default=1000, help="뱅크 시나리오 수")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
 
-ph_step_changes, turbidity_step_changes, ammonia_step_changes = [], [], []
-for idx, cnt in enumerate(steps_per_time):
-    ph_step_changes.extend([ph_changes[idx]] * cnt)
-    turbidity_step_changes.extend([turbidity_changes[idx]] * cnt)
-    ammonia_step_changes.extend([ammonia_changes[idx]] * cnt)
-
-# CSV 파일 저장
-with open('fixed_env_changes2.csv', 'w', newline='') as f:
-    writer = csv.writer(f)
-    writer.writerow(['step', 'pH_change', 'turbidity_change', 'ammonia_change'])
-    for step in range(60):
-        writer.writerow([step + 1, ph_step_changes[step], turbidity_step_changes[step], ammonia_step_changes[step]])
\ No newline at end of file
+    if args.bank is None:
+        write_trace_csv(profile_trace(args.influx, max_changes=args.max_changes), args.out)
+    else:
+        bank = generate_bank(args.bank, args.n, seed=args.seed)
+        print(f"{args.bank}: {bank.shape}")
@@ -1,5 +1,6 @@
 import numpy as np
-import random
+
+from rng_waterpark import UniformStream
 
 def get_influx_multiplier(hour):
     if 14 <= hour < 17:
@@ -12,11 +13,38 @@ def get_influx_multiplier(hour):
         return 0.0
 
 class WaterParkEnv:
-    def __init__(self, max_steps=60, max_replace=20):
+    # 상태를 float 속성으로 보관 -> step마다 ndarray/dict를 새로 만들지 않음
+    __slots__ = ('max_steps', 'max_replace', 'return_info', 'rng',
+                 'ammonia', 'turbidity', 'ph', 'replace_left', 'current_step',
+                 'steps', 'replace_count', 'done')
+
+    def __init__(self, max_steps=60, max_replace=20, return_info=True, seed=None):
         self.max_steps = max_steps
         self.max_replace = max_replace
+        self.return_info = return_info  #False면 step의 info는 None
+        #환경 전용 난수 스트림 (seed: int / SeedSequence / Generator)
+        self.rng = UniformStream(seed)
         self.reset()
 
+    @property
+    def state(self):
+        return np.array([self.ammonia, self.turbidity, self.ph, self.replace_left, self.current_step], dtype=float)
+
+    @state.setter
+    def state(self, value):
+        self.ammonia, self.turbidity, self.ph, self.replace_left, self.current_step = (float(v) for v in value)
+
+    def _write_state(self, out):
+        # out 버퍼가 있으면 그대로 채워서 반환 (할당 없음)
+        if out is None:
+            return self.state
+        out[0] = self.ammonia
+        out[1] = self.turbidity
+        out[2] = self.ph
+        out[3] = self.replace_left
+        out[4] = self.current_step
+        return out
+
     def get_current_guests(self, step):
         hour = 9 + (step * 10) // 60
         if 9 <= hour < 12:
@@ -36,64 +64,71 @@ class WaterParkEnv:
         ammonia, turbidity, ph, *_ = state
         return (ammonia > 0.5) and (turbidity > 2.8) and (ph < 5.8 or ph > 8.6)
 
-    def reset(self):
-        self.state = np.array([
-            random.uniform(0, 0.5),
-            random.uniform(0, 2.8),
-            random.uniform(5.8, 8.6),
-            self.max_replace,
-            0
-        ])
+    def checkpoint_state(self):
+        """체크포인트용 환경 상태 (난수 스트림, 에피소드 경계에서 저장)"""
+        return {'rng': self.rng.get_state()}
+
+    def restore_state(self, state):
+        self.rng.set_state(state['rng'])
+
+    def reset(self, out=None):
+        """
+        Args:
+            out (ndarray): 상태를 써 넣을 (5,) 버퍼 (None이면 새 배열 반환)
+        """
+        rng = self.rng
+        self.ammonia = rng.uniform(0, 0.5)
+        self.turbidity = rng.uniform(0, 2.8)
+        self.ph = rng.uniform(5.8, 8.6)
+        self.replace_left = self.max_replace
+        self.current_step = 0
         self.steps = 0
         self.replace_count = 0
         self.done = False
-        return self.state.copy()
+        return self._write_state(out)
 
-    def step(self, action):
-        ammonia, turbidity, ph, replace_left, current_step = self.state
+    def step(self, action, out=None):
+        """
+        Args:
+            action (int): 0 = 유지 / 1 = 교체
+            out (ndarray): 다음 상태를 써 넣을 (5,) 버퍼 (None이면 새 배열 반환)
+        """
+        ammonia, turbidity, ph, replace_left, current_step = self.ammonia, self.turbidity, self.ph, self.replace_left, self.current_step
+        rng = self.rng
         reward = 0
         done = False
         hour = 9 + (int(current_step) * 10) // 60
         influx_multiplier = get_influx_multiplier(hour)
         if action == 1 and replace_left > 0:
-            self.state = np.array([
-                random.uniform(0, 0.2),
-                random.uniform(0, 2.0),
-                random.uniform(6.0, 8.0),
-                replace_left - 1,
-                current_step + 1
-            ])
+            self.ammonia = rng.uniform(0, 0.2)
+            self.turbidity = rng.uniform(0, 2.0)
+            self.ph = rng.uniform(6.0, 8.0)
+            self.replace_left = replace_left - 1
             self.replace_count += 1
         elif action == 1 and replace_left <= 0:
-            self.state[4] += 1
+            pass  #교체할 물 없음: 수질 그대로
         else:
             #ph +-3.5만큼 변동
-            ph_change = random.uniform(-3.0, 3.0) * influx_multiplier
-            new_ph = ph + ph_change
+            ph_change = rng.uniform(-3.0, 3.0) * influx_multiplier
+            self.ph = ph + ph_change
             #탁도 최대 +5만큼 변동
-            new_turbidity = turbidity + random.uniform(3.0, 5.0) * influx_multiplier
+            self.turbidity = turbidity + rng.uniform(3.0, 5.0) * influx_multiplier
             #암모니아 최대 +7만큼 변동
-            new_ammonia = ammonia + random.uniform(3.0, 7.0) * influx_multiplier
-            self.state = np.array([
-                new_ammonia,
-                new_turbidity,
-                new_ph,
-                replace_left,
-                current_step + 1
-            ])
+            self.ammonia = ammonia + rng.uniform(3.0, 7.0) * influx_multiplier
+        self.current_step = current_step + 1
         self.steps += 1
 
         # 기준 초과 개수
         exceed_count = 0
-        if self.state[0] > 0.5:
+        if self.ammonia > 0.5:
             exceed_count += 1
-        if self.state[1] > 2.8:
+        if self.turbidity > 2.8:
             exceed_count += 1
-        if self.state[2] < 5.8 or self.state[2] > 8.6:
+        if self.ph < 5.8 or self.ph > 8.6:
             exceed_count += 1
 
-        #보상 함수: 기준 초과 개수 및 액션
-        if self.is_all_optimal(self.state) and action == 1:
+        #보상 함수: 기준 초과 개수 및 액션 (exceed_count == 0 <=> is_all_optimal)
+        if exceed_count == 0 and action == 1:
             reward = -1.0  #최적 상태에서 교체(자원 낭비)
         elif exceed_count == 1: #1개 초과
             if action == 1: #교체
@@ -110,7 +145,7 @@ class WaterParkEnv:
                 reward = 0.8
             else: #유지
                 reward = -1.0
-        elif self.is_all_optimal(self.state) and action == 0: #모두 정상
+        elif exceed_count == 0 and action == 0: #모두 정상
             reward = 0.6 #유지
             
         # #모든 수질이 최적인데 물교체(큰 패널티)
@@ -140,14 +175,17 @@ class WaterParkEnv:
         reward += replace_penalty
 
 
-        if self.state[4] >= self.max_steps or self.steps >= self.max_steps:
+        if self.current_step >= self.max_steps or self.steps >= self.max_steps:
             done = True
         self.done = done
-        return self.state.copy(), reward, done, {
-            'ammonia': self.state[0],
-            'turbidity': self.state[1],
-            'ph': self.state[2],
-            'replace_left': self.state[3],
-            'step': self.state[4],
-            'guests': self.get_current_guests(int(self.state[4]))
-        }
+        info = None
+        if self.return_info:
+            info = {
+                'ammonia': self.ammonia,
+                'turbidity': self.turbidity,
+                'ph': self.ph,
+                'replace_left': self.replace_left,
+                'step': self.current_step,
+                'guests': self.get_current_guests(int(self.current_step))
+            }
+        return self._write_state(out), reward, done, info
@@ -0,0 +1,198 @@
+import numpy as np
+
+from env_waterpark import get_influx_multiplier
+from env_waterpark_vector import (
+    STOCHASTIC_REWARDS, FIXED_REWARDS, FIXED_INITIAL, FIXED_REPLACED,
+    STOCHASTIC_INITIAL_RANGE, STOCHASTIC_REPLACED_RANGE, STOCHASTIC_DRIFT_RANGE,
+)
+from trace_waterpark import load_trace
+
+
+def exceed_counts(quality):
+    """(P, 3) 수질 [ammonia, turbidity, pH] -> 풀별 기준 초과 개수 (0~3)"""
+    ph = quality[:, 2]
+    return ((quality[:, 0] > 0.5).astype(np.intp)
+            + (quality[:, 1] > 2.8)
+            + ((ph < 5.8) | (ph > 8.6)))
+
+
+class FacilityWaterParkEnv:
+    """
+    풀 n_pools개를 가진 시설 환경. 모든 풀이 같은 시각에 NumPy 배열로 함께 진행되고,
+    물 교체는 풀별 max_replace 대신 시설 전체가 공유하는 하루 교체 예산(budget)에서 차감.
+
+    풀마다 유입 프로필이 다름:
+      - csv_paths[i]가 None이면 확률 풀: get_influx_multiplier(시간) * influx_scales[i]로 변화량 조절
+      - CSV 경로면 고정 풀: 해당 변화량 트레이스 사용 (env_waterpark_fixed와 같은 보상 테이블)
+
+    보상은 풀별 보상(env_waterpark / env_waterpark_fixed와 같은 규칙)의 합.
+    """
+
+    def __init__(self, n_pools, budget=None, max_steps=60, csv_paths=None, influx_scales=None, seed=None):
+        """
+        Args:
+            n_pools (int): 풀 수
+            budget (int): 하루 공유 교체 예산 (None이면 풀당 20회)
+            max_steps (int): 에피소드 스텝 수
+            csv_paths (list): 풀별 변화량 CSV 경로 (None 원소는 확률 풀, 리스트 자체가 None이면 모두 확률 풀)
+            influx_scales (array): 확률 풀별 유입량 배율 (None이면 모두 1)
+            seed (int): 난수 시드
+        """
+        if csv_paths is None:
+            csv_paths = [None] * n_pools
+        if len(csv_paths) != n_pools:
+            raise ValueError(f"csv_paths 길이({len(csv_paths)})가 n_pools({n_pools})와 다름")
+        self.n_pools = n_pools
+        self.max_steps = max_steps
+        self.budget = n_pools * 20 if budget is None else budget
+        self.rng = np.random.default_rng(seed)
+
+        self.fixed = np.array([path is not None for path in csv_paths], dtype=bool)
+        self.fixed_idx = np.flatnonzero(self.fixed)
+        self.random_idx = np.flatnonzero(~self.fixed)
+
+        # 확률 풀: (P_random, max_steps) 스텝별 유입 배율
+        hours = 9 + (np.arange(max_steps) * 10) // 60
+        influx = np.array([get_influx_multiplier(h) for h in hours])
+        scales = np.ones(n_pools) if influx_scales is None else np.broadcast_to(np.asarray(influx_scales, dtype=float), (n_pools,))
+        self.influx = scales[self.random_idx, None] * influx
+
+        # 고정 풀: (max_steps, P_fixed, 3) 스텝별 변화량 (트레이스가 짧으면 마지막 행 반복)
+        steps = np.arange(max_steps)
+        traces = [load_trace(csv_paths[i]) for i in self.fixed_idx]
+        self.trace_drift = np.stack([trace[np.minimum(steps, len(trace) - 1)] for trace in traces], axis=1) \
+            if traces else np.zeros((max_steps, 0, 3))
+
+        # 풀별 보상 테이블 (P, 4) -> 1차원으로 펼쳐서 (풀 * 4 + 초과 개수)로 조회
+        fixed = self.fixed[:, None]
+        self._keep = np.where(fixed, FIXED_REWARDS['keep'], STOCHASTIC_REWARDS['keep']).ravel()
+        self._replace = np.where(fixed, FIXED_REWARDS['replace'], STOCHASTIC_REWARDS['replace']).ravel()
+        self._row = np.arange(n_pools) * 4
+        self.no_water_penalty = np.where(self.fixed, FIXED_REWARDS['no_water_penalty'], STOCHASTIC_REWARDS['no_water_penalty'])
+        self.replace_penalty = np.where(self.fixed, FIXED_REWARDS['replace_penalty'], STOCHASTIC_REWARDS['replace_penalty'])
+
+        # (P, 5) 상태 [ammonia, turbidity, pH, 공유 예산 잔량, timestep]
+        self.states = np.zeros((n_pools, 5))
+        self.replace_count = np.zeros(n_pools, dtype=np.int64)
+        self.reset()
+
+    @property
+    def quality(self):
+        return self.states[:, :3]
+
+    def _replaced_quality(self, pools):
+        """교체한 풀들의 새 수질 (고정 풀은 상수, 확률 풀은 범위 내 난수)"""
+        values = self.rng.uniform(*STOCHASTIC_REPLACED_RANGE, (len(pools), 3))
+        values[self.fixed[pools]] = FIXED_REPLACED
+        return values
+
+    def reset(self):
+        """
+        Returns:
+            ndarray: (P, 5) 초기 상태
+        """
+        self.states[self.fixed_idx, :3] = FIXED_INITIAL
+        self.states[self.random_idx, :3] = self.rng.uniform(*STOCHASTIC_INITIAL_RANGE, (len(self.random_idx), 3))
+        self.budget_left = self.budget
+        self.current_step = 0
+        self.states[:, 3] = self.budget_left
+        self.states[:, 4] = 0
+        self.replace_count[:] = 0
+        return self.states.copy()
+
+    def allocate(self, request, priority=None):
+        """
+        교체 요청을 남은 예산 안에서 승인. 예산보다 요청이 많으면 priority가 큰 풀부터 승인
+        (priority가 None이면 현재 기준 초과 개수가 많은 풀부터, 같으면 풀 번호 순).
+
+        Returns:
+            ndarray: (P,) 승인된 교체 여부
+        """
+        requested = np.flatnonzero(request)
+        if len(requested) <= self.budget_left:
+            return request
+        if priority is None:
+            priority = exceed_counts(self.quality)
+        order = np.argsort(-np.asarray(priority)[requested], kind='stable')
+        granted = np.zeros(self.n_pools, dtype=bool)
+        granted[requested[order[:self.budget_left]]] = True
+        return granted
+
+    def step(self, actions, priority=None):
+        """
+        모든 풀을 한 스텝 진행
+
+        Args:
+            actions (ndarray): (P,) 0 = 유지 / 1 = 교체 요청
+            priority (ndarray): (P,) 예산이 부족할 때 승인 우선순위 (클수록 먼저)
+
+        Returns:
+            states: (P, 5) 다음 상태
+            reward (float): 모든 풀 보상의 합
+            done (bool): 에피소드 종료 여부 (모든 풀 공통)
+            info (dict): pool_rewards (P,), replaced (P,), denied (P,), budget_left
+        """
+        if self.current_step >= self.max_steps:
+            raise RuntimeError("에피소드가 끝났음 (reset 필요)")
+        quality = self.states[:, :3]
+        request = np.asarray(actions) == 1
+        replaced = self.allocate(request, priority)
+        denied = request & ~replaced  # 예산 없이 교체 시도 -> 단일 풀의 '물 없음'과 같은 처리
+        step = self.current_step
+
+        # 유지한 풀만 수질 변화 적용
+        drift = np.empty((self.n_pools, 3))
+        drift[self.random_idx] = self.rng.uniform(*STOCHASTIC_DRIFT_RANGE, (len(self.random_idx), 3))
+        drift[self.random_idx] *= self.influx[:, step, None]
+        drift[self.fixed_idx] = self.trace_drift[step]
+        np.add(quality, drift, out=quality, where=~request[:, None])
+
+        # 교체한 풀은 수질 초기화
+        pools = np.flatnonzero(replaced)
+        if len(pools):
+            quality[pools] = self._replaced_quality(pools)
+            self.budget_left -= len(pools)
+            self.replace_count[pools] += 1
+        self.current_step = step + 1
+        self.states[:, 3] = self.budget_left
+        self.states[:, 4] = self.current_step
+
+        # 풀별 보상 (기준 초과 개수 * 행동)
+        index = self._row + exceed_counts(quality)
+        replace_reward = self._replace[index] + self.replace_penalty + np.where(denied, self.no_water_penalty, 0.0)
+        pool_rewards = np.where(request, replace_reward, self._keep[index])
+
+        done = self.current_step >= self.max_steps
+        info = {
+            'pool_rewards': pool_rewards,
+            'replaced': replaced,
+            'denied': denied,
+            'budget_left': self.budget_left,
+        }
+        return self.states.copy(), float(pool_rewards.sum()), done, info
+
+
+if __name__ == "__main__":
+    import time
+
+    # 1000개 풀: 4개 중 1개(i % 4 == 0)는 CSV 트레이스(4개 CSV를 번갈아 사용), 나머지는 유입 배율이 다른 확률 풀
+    n_pools = 1000
+    csv_list = ["fixed_env_changes1.csv", "fixed_env_changes2.csv", "fixed_env_changes3.csv", "fixed_env_changes4.csv"]
+    csv_paths = [csv_list[(i // 4) % len(csv_list)] if i % 4 == 0 else None for i in range(n_pools)]
+    scales = np.random.default_rng(0).uniform(0.5, 1.5, n_pools)
+
+    # 교체 예산 배분 정책: 기준 초과 개수가 threshold 이상인 풀만 교체 요청
+    for budget in (n_pools * 5, n_pools * 20):
+        for threshold in (1, 2, 3):
+            env = FacilityWaterParkEnv(n_pools, budget=budget, csv_paths=csv_paths, influx_scales=scales, seed=0)
+            states = env.reset()
+            total, done, n_steps = 0.0, False, 0
+            start = time.perf_counter()
+            while not done:
+                actions = (exceed_counts(states[:, :3]) >= threshold).astype(np.int8)
+                states, reward, done, info = env.step(actions)
+                total += reward
+                n_steps += 1
+            elapsed = time.perf_counter() - start
+            print(f"budget {budget:>6} / threshold {threshold} / reward {total:>10.1f} / "
+                  f"used {budget - env.budget_left:>6} / {n_steps / elapsed:,.0f} steps/s")
@@ -1,41 +1,137 @@
 import numpy as np
-import pandas as pd
+
+from trace_waterpark import csv_hash, load_trace, load_bank, trace_digest
 
 class WaterParkEnv:
     """
-    고정 환경(Randomness 없음). fixed_env_changes*.csv의 수질 변화량 데이터를 사용.
+    고정 환경(Randomness 없음). fixed_env_changes*.csv 또는 시나리오 뱅크의 수질 변화량 데이터를 사용.
+    상태는 float 속성으로 보관 -> step마다 ndarray/dict를 새로 만들지 않음.
     """
 
-    def __init__(self, csv_path, max_steps=60, max_replace=20):
+    __slots__ = ('trace', 'trace_hash', '_deltas', 'max_steps', 'max_replace', 'replace_penalty', 'return_info',
+                 'bank', 'scenario', '_order', '_cursor',
+                 'ammonia', 'turbidity', 'ph', 'replace_left', 'current_step',
+                 'steps', 'replace_count', 'done')
+
+    def __init__(self, csv_path=None, max_steps=60, max_replace=20, cache_dir=None, return_info=True, replace_penalty=-0.36,
+                 bank=None, scenario=0, scenarios=None):
         """
         Args:
-            csv_path (str): pH, turbidity, ammonia 변화량이 들어있는 CSV 파일
+            csv_path (str): pH, turbidity, ammonia 변화량이 들어있는 CSV 파일 (bank와 둘 중 하나만 지정)
             max_steps (int): 환경 스텝 수 (기본: 60분)
             max_replace (int): 물 교체 최대 횟수
+            cache_dir (str): 변화량 배열(.npy) 캐시 폴더 (None이면 메모리 캐시만 사용)
+            return_info (bool): False면 step의 info는 None
+            replace_penalty (float): 교체 시도 한 번 당 페널티
+            bank (str | ndarray): 시나리오 뱅크 .npy 경로 또는 (scenarios, steps, 3) 배열 (memory-map으로 열고 시나리오만 읽음)
+            scenario (int): 사용할 뱅크 시나리오 번호 (select로 변경)
+            scenarios (sequence): 지정하면 reset마다 이 순서대로 다음 시나리오로 넘어감 (끝나면 처음부터 반복)
         """
-        self.csv = pd.read_csv(csv_path)
+        if (csv_path is None) == (bank is None):
+            raise ValueError("csv_path와 bank 중 하나만 지정해야 함")
         self.max_steps = max_steps
         self.max_replace = max_replace
+        self.replace_penalty = replace_penalty
+        self.return_info = return_info
+        self.bank = None
+        self.scenario = None
+        self._order = None
+        self._cursor = 0
+        if bank is None:
+            # (steps, 3) 변화량 배열 [ammonia, turbidity, pH]
+            digest = csv_hash(csv_path)  # 캐시 키 (변화량 캐시 + 평가 결과 캐시), 파일은 한 번만 해시
+            self._set_trace(load_trace(csv_path, cache_dir, digest), digest)
+        else:
+            self.bank = load_bank(bank) if isinstance(bank, str) else bank
+            if scenarios is not None:
+                self._order = np.asarray(scenarios, dtype=np.intp)
+                if len(self._order) == 0:
+                    raise ValueError("scenarios가 비어 있음")
+                scenario = self._order[0]
+            self.select(scenario)
         self.reset()
+        self._cursor = 0  # 첫 에피소드의 reset도 첫 시나리오 사용
+
+    def _set_trace(self, trace, trace_hash):
+        self.trace = trace
+        self.trace_hash = trace_hash
+        # step에서 쓰는 float 변화량 (ndarray 원소 접근 비용 제거)
+        self._deltas = trace.tolist()
+
+    @property
+    def n_scenarios(self):
+        return 1 if self.bank is None else len(self.bank)
+
+    def select(self, scenario):
+        """
+        뱅크의 scenario번 시나리오로 변경 (해당 시나리오 (steps, 3)만 읽음, 변경 후 reset해서 사용).
+        scenarios 순서로 돌고 있으면 다음 reset에서 다시 순서대로 바뀜.
 
-    def reset(self):
+        Returns:
+            self
+        """
+        if self.bank is None:
+            raise ValueError("CSV로 만든 환경은 시나리오를 선택할 수 없음")
+        scenario = int(scenario)
+        if not -len(self.bank) <= scenario < len(self.bank):
+            raise IndexError(f"시나리오 번호 {scenario}가 뱅크 크기 {len(self.bank)}를 벗어남")
+        trace = np.asarray(self.bank[scenario], dtype=np.float64)
+        # 순서대로 바뀌는 환경은 결정론적 평가 캐시를 쓰지 않음 (trace_hash = None)
+        self._set_trace(trace, trace_digest(trace) if self._order is None else None)
+        self.scenario = scenario % len(self.bank)
+        return self
+
+    def checkpoint_state(self):
+        """체크포인트용 환경 상태 (난수 없음 -> scenarios 순서로 돌 때의 진행 위치만)"""
+        return {'cursor': self._cursor} if self._order is not None else {}
+
+    def restore_state(self, state):
+        if self._order is not None and 'cursor' in state:
+            self._cursor = state['cursor']
+
+    @property
+    def state(self):
+        return np.array([self.ammonia, self.turbidity, self.ph, self.replace_left, self.current_step], dtype=float)
+
+    @state.setter
+    def state(self, value):
+        self.ammonia, self.turbidity, self.ph, self.replace_left, self.current_step = (float(v) for v in value)
+
+    def _write_state(self, out):
+        # out 버퍼가 있으면 그대로 채워서 반환 (할당 없음)
+        if out is None:
+            return self.state
+        out[0] = self.ammonia
+        out[1] = self.turbidity
+        out[2] = self.ph
+        out[3] = self.replace_left
+        out[4] = self.current_step
+        return out
+
+    def reset(self, out=None):
         """
-        상태 초기화 (결정론적 초기값)
+        상태 초기화 (결정론적 초기값, scenarios 순서가 있으면 다음 시나리오로 넘어감)
+
+        Args:
+            out (ndarray): 상태를 써 넣을 (5,) 버퍼 (None이면 새 배열 반환)
 
         Returns:
             ndarray: 초기 상태 [ammonia, turbidity, pH, replace_left, timestep]
         """
-        self.state = np.array([
-            0.2,   # ammonia
-            1.5,   # turbidity
-            7.2,   # pH
-            self.max_replace,
-            0
-        ])
+        if self._order is not None:
+            # 시나리오 순서 스트리밍: 에피소드마다 다음 시나리오
+            if self._cursor:
+                self.select(self._order[self._cursor % len(self._order)])
+            self._cursor += 1
+        self.ammonia = 0.2
+        self.turbidity = 1.5
+        self.ph = 7.2
+        self.replace_left = self.max_replace
+        self.current_step = 0
         self.steps = 0
         self.replace_count = 0
         self.done = False
-        return self.state.copy()
+        return self._write_state(out)
 
     def get_current_guests(self, step):
         """환경 구조 통일용 인터페이스 (의미 X)"""
@@ -49,49 +145,48 @@ class WaterParkEnv:
         ammonia, turbidity, ph, *_ = state
         return (ammonia > 0.5) and (turbidity > 2.8) and (ph < 5.8 or ph > 8.6)
 
-    def step(self, action):
+    def step(self, action, out=None):
         """
         한 스텝 진행 (동일한 시나리오로 수질 변화)
 
         Args:
             action (int): 0 = 유지 / 1 = 교체
+            out (ndarray): 다음 상태를 써 넣을 (5,) 버퍼 (None이면 새 배열 반환)
 
         Returns:
             next_state, reward, done, info
         """
-        ammonia, turbidity, ph, replace_left, current_step = self.state
-
-        row = self.csv.iloc[min(int(current_step), len(self.csv) - 1)]
-        ph_delta = row['pH_change']
-        turbidity_delta = row['turbidity_change']
-        ammonia_delta = row['ammonia_change']
+        replace_left, current_step = self.replace_left, self.current_step
 
         if action == 1 and replace_left > 0:
             # 물을 교체하면 수질 초기화
-            self.state = np.array([0.1, 1.0, 7.2, replace_left - 1, current_step + 1])
+            self.ammonia, self.turbidity, self.ph = 0.1, 1.0, 7.2
+            self.replace_left = replace_left - 1
             self.replace_count += 1
         elif action == 1 and replace_left <= 0:
             # 물 없음에도 교체 시도
-            self.state[4] += 1
+            pass
         else:
             # 수질 변화 적용
-            ph = ph + ph_delta
-            turbidity = turbidity + turbidity_delta
-            ammonia = ammonia + ammonia_delta
-            self.state = np.array([ammonia, turbidity, ph, replace_left, current_step + 1])
+            deltas = self._deltas
+            ammonia_delta, turbidity_delta, ph_delta = deltas[min(int(current_step), len(deltas) - 1)]
+            self.ph = self.ph + ph_delta
+            self.turbidity = self.turbidity + turbidity_delta
+            self.ammonia = self.ammonia + ammonia_delta
             self.steps += 1
+        self.current_step = current_step + 1
 
         # 기준 초과 개수
         exceed_count = 0
-        if self.state[0] > 0.5:
+        if self.ammonia > 0.5:
             exceed_count += 1
-        if self.state[1] > 2.8:
+        if self.turbidity > 2.8:
             exceed_count += 1
-        if self.state[2] < 5.8 or self.state[2] > 8.6:
+        if self.ph < 5.8 or self.ph > 8.6:
             exceed_count += 1
 
-        #보상 함수: 기준 초과 개수 및 액션
-        if self.is_all_optimal(self.state) and action == 1:
+        #보상 함수: 기준 초과 개수 및 액션 (exceed_count == 0 <=> is_all_optimal)
+        if exceed_count == 0 and action == 1:
             reward = -1.0  #최적 상태에서 교체(자원 낭비)
         elif exceed_count == 1: #1개 초과
             if action == 1: #교체
@@ -108,7 +203,7 @@ class WaterParkEnv:
                 reward = 0.8
             else: #유지
                 reward = -1.0
-        elif self.is_all_optimal(self.state) and action == 0: #모두 정상
+        elif exceed_count == 0 and action == 0: #모두 정상
             reward = 0.6 #유지
             
         #교체할 물이 없는데 교체 시도
@@ -116,22 +211,23 @@ class WaterParkEnv:
             reward -= 0.4
 
         # 기존 reward 산정 이후 아래 패널티 추가
-        replace_penalty = 0
         if action == 1:  # 물 교체 시도 시
-            replace_penalty = -0.36 # 교체 한 번 당 페널티
-        reward += replace_penalty
+            reward += self.replace_penalty # 교체 한 번 당 페널티
 
         done = False
-        if self.state[4] >= self.max_steps or self.steps >= self.max_steps:
+        if self.current_step >= self.max_steps or self.steps >= self.max_steps:
             done = True
 
         self.done = done
 
-        return self.state.copy(), reward, done, {
-            'ammonia': self.state[0],
-            'turbidity': self.state[1],
-            'ph': self.state[2],
-            'replace_left': self.state[3],
-            'step': self.state[4],
-            'guests': self.get_current_guests(int(self.state[4]))
-        }
+        info = None
+        if self.return_info:
+            info = {
+                'ammonia': self.ammonia,
+                'turbidity': self.turbidity,
+                'ph': self.ph,
+                'replace_left': self.replace_left,
+                'step': self.current_step,
+                'guests': self.get_current_guests(int(self.current_step))
+            }
+        return self._write_state(out), reward, done, info
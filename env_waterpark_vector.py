@@ -0,0 +1,163 @@
+import numpy as np
+
+from env_waterpark import get_influx_multiplier
+from trace_waterpark import load_trace
+
+# 보상 테이블: 기준 초과 개수(0~3)별 유지/교체 보상
+# 확률 환경(env_waterpark)과 고정 환경(env_waterpark_fixed)의 값이 다름
+STOCHASTIC_REWARDS = {
+    'keep': np.array([0.6, -0.1, -0.7, -1.0]),
+    'replace': np.array([-1.0, 0.3, 0.6, 0.8]),
+    'no_water_penalty': -0.4,
+    'replace_penalty': -0.4,
+}
+
+FIXED_REWARDS = {
+    'keep': np.array([0.6, -0.1, -0.6, -1.0]),
+    'replace': np.array([-1.0, 0.2, 0.5, 0.8]),
+    'no_water_penalty': -0.4,
+    'replace_penalty': -0.36,
+}
+
+# 수질 [ammonia, turbidity, pH] 초기값/교체 후 값/변화량 범위
+FIXED_INITIAL = np.array([0.2, 1.5, 7.2])
+FIXED_REPLACED = np.array([0.1, 1.0, 7.2])
+STOCHASTIC_INITIAL_RANGE = (np.array([0.0, 0.0, 5.8]), np.array([0.5, 2.8, 8.6]))
+STOCHASTIC_REPLACED_RANGE = (np.array([0.0, 0.0, 6.0]), np.array([0.2, 2.0, 8.0]))
+STOCHASTIC_DRIFT_RANGE = (np.array([3.0, 3.0, -3.0]), np.array([7.0, 5.0, 3.0]))
+
+
+class VectorWaterParkEnv:
+    """
+    WaterParkEnv n_envs개를 NumPy 배열로 동시에 진행하는 배치 환경.
+
+    csv_path가 없으면 env_waterpark.WaterParkEnv(확률 환경)와,
+    있으면 env_waterpark_fixed.WaterParkEnv(고정 환경)와 같은 에피소드 동역학을 따름.
+    끝난 환경은 step 안에서 자동으로 reset됨.
+    """
+
+    def __init__(self, n_envs, max_steps=60, max_replace=20, csv_path=None, seed=None):
+        """
+        Args:
+            n_envs (int): 동시에 진행할 환경 수
+            max_steps (int): 에피소드 스텝 수
+            max_replace (int): 물 교체 최대 횟수
+            csv_path (str): 고정 환경 변화량 CSV (None이면 확률 환경)
+            seed (int): 난수 시드 (확률 환경에서만 사용)
+        """
+        self.n_envs = n_envs
+        self.max_steps = max_steps
+        self.max_replace = max_replace
+        self.rng = np.random.default_rng(seed)
+        self.fixed = csv_path is not None
+
+        if self.fixed:
+            # 상태 순서(ammonia, turbidity, pH)에 맞춘 스텝별 변화량
+            self.deltas = load_trace(csv_path)
+            self.rewards = FIXED_REWARDS
+        else:
+            hours = 9 + (np.arange(max_steps) * 10) // 60
+            self.influx = np.array([get_influx_multiplier(h) for h in hours])
+            self.rewards = STOCHASTIC_REWARDS
+
+        # (n_envs, 5) 상태 [ammonia, turbidity, pH, replace_left, timestep]
+        self.states = np.zeros((n_envs, 5))
+        self.replace_count = np.zeros(n_envs, dtype=np.int64)
+        self.reset()
+
+    @property
+    def ammonia(self):
+        return self.states[:, 0]
+
+    @property
+    def turbidity(self):
+        return self.states[:, 1]
+
+    @property
+    def ph(self):
+        return self.states[:, 2]
+
+    @property
+    def replace_left(self):
+        return self.states[:, 3]
+
+    @property
+    def step_count(self):
+        return self.states[:, 4]
+
+    def _reset_envs(self, mask):
+        n = int(np.count_nonzero(mask))
+        if n == 0:
+            return
+        if self.fixed:
+            self.states[mask, :3] = FIXED_INITIAL
+        else:
+            self.states[mask, :3] = self.rng.uniform(*STOCHASTIC_INITIAL_RANGE, (n, 3))
+        self.states[mask, 3] = self.max_replace
+        self.states[mask, 4] = 0
+        self.replace_count[mask] = 0
+
+    def get_states(self):
+        """
+        Returns:
+            ndarray: (n_envs, 5) 상태 [ammonia, turbidity, pH, replace_left, timestep]
+        """
+        return self.states.copy()
+
+    def reset(self):
+        self._reset_envs(np.ones(self.n_envs, dtype=bool))
+        return self.get_states()
+
+    def step(self, actions):
+        """
+        모든 환경을 한 스텝 진행
+
+        Args:
+            actions (ndarray): (n_envs,) 0 = 유지 / 1 = 교체
+
+        Returns:
+            states, rewards, dones, infos
+            (끝난 환경의 states는 reset된 상태, 종료 상태는 infos['final_state'])
+        """
+        states = self.states
+        quality = states[:, :3]
+        replace = np.asarray(actions) == 1
+        has_water = states[:, 3] > 0
+        do_replace = replace & has_water
+        no_water = replace & ~has_water
+        steps = states[:, 4].astype(np.intp)
+
+        if self.fixed:
+            drift = self.deltas[np.minimum(steps, len(self.deltas) - 1)]
+            replaced = FIXED_REPLACED
+        else:
+            drift = self.rng.uniform(*STOCHASTIC_DRIFT_RANGE, (self.n_envs, 3))
+            drift *= self.influx[np.minimum(steps, self.max_steps - 1)][:, None]
+            replaced = self.rng.uniform(*STOCHASTIC_REPLACED_RANGE, (self.n_envs, 3))
+
+        # 교체: 수질 초기화 / 유지: 수질 변화 적용 / 물 없이 교체 시도: 그대로
+        quality[:] = np.where(do_replace[:, None], replaced,
+                              np.where(replace[:, None], quality, quality + drift))
+        states[:, 3] -= do_replace
+        states[:, 4] += 1
+        self.replace_count += do_replace
+
+        # 기준 초과 개수별 보상
+        ph = quality[:, 2]
+        exceed_count = ((quality[:, 0] > 0.5).astype(np.intp)
+                        + (quality[:, 1] > 2.8)
+                        + ((ph < 5.8) | (ph > 8.6)))
+        table = self.rewards
+        replace_reward = table['replace'][exceed_count] + np.where(no_water, table['no_water_penalty'], 0.0)
+        rewards = np.where(replace, replace_reward + table['replace_penalty'], table['keep'][exceed_count])
+
+        dones = states[:, 4] >= self.max_steps
+        final_state = states.copy()
+        infos = {
+            'final_state': final_state,
+            'replace_count': self.replace_count.copy(),
+        }
+        if dones.any():
+            self._reset_envs(dones)
+            return states.copy(), rewards, dones, infos
+        return final_state, rewards, dones, infos
@@ -0,0 +1,50 @@
+from collections import OrderedDict
+
+
+def is_deterministic(env, policy):
+    """
+    (환경, 정책) 쌍이 결정론적인지: 고정 환경(CSV 해시 보유) + deterministic 정책
+    """
+    return getattr(env, 'trace_hash', None) is not None and getattr(policy, 'deterministic', False)
+
+
+class PolicyEvaluator:
+    """
+    정책 평가 결과 캐시.
+    결정론적인 (환경, 정책) 쌍은 1 에피소드만 실행하고 결과를 episodes개로 복제해서 반환,
+    결과는 (CSV 해시, 환경 설정, 정책 키)로 LRU 캐시에 보관.
+    """
+
+    def __init__(self, run_fn, maxsize=128):
+        """
+        Args:
+            run_fn: run_policy(env, policy, quantize, episodes) 형태의 평가 함수
+            maxsize (int): 캐시할 결과 수 (초과 시 가장 오래 안 쓴 것부터 제거)
+        """
+        self.run_fn = run_fn
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def cache_key(self, env, policy, quantize):
+        return (env.trace_hash, env.max_steps, env.max_replace, getattr(env, 'replace_penalty', None), bool(quantize),
+                self.run_fn.__module__, self.run_fn.__qualname__, policy.cache_key())
+
+    def evaluate(self, env, policy, quantize, episodes):
+        """run_fn과 같은 형태의 결과 반환 (결정론적이면 O(1) 에피소드)"""
+        if not is_deterministic(env, policy):
+            return self.run_fn(env, policy, quantize=quantize, episodes=episodes)
+
+        key = self.cache_key(env, policy, quantize)
+        result = self.cache.get(key)
+        if result is None:
+            self.misses += 1
+            result = tuple(values[0] for values in self.run_fn(env, policy, quantize=quantize, episodes=1))
+            self.cache[key] = result
+            if len(self.cache) > self.maxsize:
+                self.cache.popitem(last=False)
+        else:
+            self.hits += 1
+            self.cache.move_to_end(key)
+        return tuple([value] * episodes for value in result)
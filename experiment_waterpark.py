@@ -0,0 +1,123 @@
+import csv
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from env_waterpark_fixed import WaterParkEnv
+from agent_waterpark import QAgent, FixedIntervalPolicy
+from solver_waterpark import solve_optimal
+from convergence_waterpark import ConvergenceMonitor
+from train_waterpark_fixed import CSV_LIST, evaluator, train_qlearning
+
+# 기본 하이퍼파라미터 (train_waterpark_fixed.py와 동일)
+DEFAULT_CONFIG = {
+    'alpha': 0.1,
+    'gamma': 0.95,
+    'epsilon': 0.1,
+    'epsilon_decay': 0.9995,
+    'epsilon_min': 0.01,
+}
+
+RESULT_FIELDS = [
+    'scenario', 'seed', 'alpha', 'gamma', 'epsilon', 'epsilon_decay', 'epsilon_min',
+    'train_episodes', 'converged_episode',
+    'train_reward', 'greedy_reward', 'greedy_replaces', 'fixed_reward', 'fixed_replaces', 'optimal_reward',
+]
+
+
+def make_jobs(scenarios, seeds, configs, episodes, eval_episodes, convergence=None):
+    """(시나리오, 시드, 설정) 조합마다 하나의 작업 (convergence: ConvergenceMonitor 인자 dict)"""
+    jobs = []
+    for scenario, seed, config in itertools.product(scenarios, seeds, configs):
+        jobs.append({
+            'scenario': scenario,
+            'seed': seed,
+            'config': dict(DEFAULT_CONFIG, **config),
+            'episodes': episodes,
+            'eval_episodes': eval_episodes,
+            'convergence': convergence,
+        })
+    return jobs
+
+
+def run_job(job):
+    """
+    작업 하나 실행 (워커 프로세스에서 호출)
+
+    Returns:
+        dict: RESULT_FIELDS 한 행
+    """
+    # 작업마다 독립된 난수 스트림 (시드 + 시나리오 + 설정으로 결정)
+    config = job['config']
+    entropy = [job['seed'], *job['scenario'].encode()] + [int(v * 1e6) for v in config.values()]
+    env = WaterParkEnv(job['scenario'], return_info=False)
+    agent = QAgent(**config, seed=np.random.SeedSequence(entropy))
+    monitor = ConvergenceMonitor(**job['convergence']) if job['convergence'] is not None else None
+    q_rewards, _ = train_qlearning(env, agent, job['episodes'], convergence=monitor)
+    greedy_rewards, greedy_replaces = evaluator.evaluate(env, agent.greedy_policy(), quantize=True, episodes=job['eval_episodes'])
+    fixed_rewards, fixed_replaces = evaluator.evaluate(env, FixedIntervalPolicy(), quantize=False, episodes=job['eval_episodes'])
+    optimal_value, _ = solve_optimal(env)
+
+    return {
+        'scenario': job['scenario'],
+        'seed': job['seed'],
+        **config,
+        'train_episodes': len(q_rewards),
+        'converged_episode': monitor.converged_episode if monitor is not None else None,
+        'train_reward': float(np.mean(q_rewards[-100:])),
+        'greedy_reward': float(np.mean(greedy_rewards)),
+        'greedy_replaces': float(np.mean(greedy_replaces)),
+        'fixed_reward': float(np.mean(fixed_rewards)),
+        'fixed_replaces': float(np.mean(fixed_replaces)),
+        'optimal_reward': optimal_value,
+    }
+
+
+def run_experiments(scenarios=CSV_LIST, seeds=range(5), configs=({},), episodes=2000, eval_episodes=2000, max_workers=None,
+                    convergence=None):
+    """
+    모든 작업을 ProcessPoolExecutor로 병렬 실행
+
+    Args:
+        scenarios (list): 변화량 CSV 목록
+        seeds (iterable): 시드 목록
+        configs (list): DEFAULT_CONFIG를 덮어쓸 QAgent 설정 목록
+        episodes (int): 학습 에피소드 수
+        eval_episodes (int): 그리디/고정 정책 평가 에피소드 수
+        max_workers (int): 프로세스 수 (None이면 CPU 코어 수)
+        convergence (dict): ConvergenceMonitor 인자 (주면 수렴 시 episodes 전에 학습 중단)
+
+    Returns:
+        list: 작업 순서대로 정리된 결과 행
+    """
+    jobs = make_jobs(scenarios, list(seeds), list(configs), episodes, eval_episodes, convergence)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(run_job, jobs))
+
+
+def save_results(results, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def print_results(results):
+    print(f"{'scenario':<24}{'seed':>5}{'alpha':>7}{'gamma':>7}{'eps':>7}"
+          f"{'greedy':>9}{'replace':>9}{'fixed':>9}{'optimal':>9}")
+    for r in results:
+        print(f"{os.path.basename(r['scenario']):<24}{r['seed']:>5}{r['alpha']:>7.2f}{r['gamma']:>7.2f}{r['epsilon']:>7.2f}"
+              f"{r['greedy_reward']:>9.2f}{r['greedy_replaces']:>9.1f}{r['fixed_reward']:>9.2f}{r['optimal_reward']:>9.2f}")
+
+
+if __name__ == "__main__":
+    configs = [
+        {},
+        {'alpha': 0.2},
+        {'gamma': 0.99},
+    ]
+    results = run_experiments(CSV_LIST, seeds=range(5), configs=configs, episodes=2000, convergence={'window': 100})
+    print_results(results)
+    save_results(results, "experiment_results.csv")
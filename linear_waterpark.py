@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from agent_waterpark import decayed_epsilon, quantize_states
+from rng_waterpark import UniformStream
+
+# 상태 [ammonia, turbidity, pH, replace_left, step]별 특징 범위 (범위 밖 값은 경계로 자름)
+STATE_LOW = np.array([0.0, 0.0, 4.0, 0.0, 0.0])
+STATE_HIGH = np.array([3.0, 5.0, 10.0, 20.0, 60.0])
+
+
+class TileCoder:
+    """
+    원본 상태 -> 활성 타일 번호 (N, n_active).
+    서로 다르게 어긋난 n_tilings개의 격자 + (include_bins면) quantize_states 구간 1개를
+    memory_size 크기의 가중치 배열에 해시해서 넣음 -> 메모리는 구간 수와 무관하게 고정.
+    """
+    kind = 'tile'
+
+    def __init__(self, tiles=(6, 6, 6, 5, 6), n_tilings=8, memory_size=1 << 14, include_bins=True,
+                 low=STATE_LOW, high=STATE_HIGH, seed=0):
+        """
+        Args:
+            tiles (tuple): 차원별 타일 수 (격자 하나 기준)
+            n_tilings (int): 격자 수 (많을수록 세밀하게 일반화)
+            memory_size (int): 가중치 수 (해시 테이블 크기)
+            include_bins (bool): 기준치 경계와 맞는 quantize_states 구간도 특징으로 추가
+        """
+        self.tiles = tuple(tiles)
+        self.n_tilings = n_tilings
+        self.memory_size = memory_size
+        self.include_bins = include_bins
+        self.low = np.asarray(low, dtype=float)
+        self.high = np.asarray(high, dtype=float)
+        self.seed = seed
+        self.n_features = memory_size
+        self.n_active = n_tilings + int(include_bins)
+        tiles = np.asarray(self.tiles)
+        # 격자마다 타일 폭의 일부만큼 어긋남 (차원마다 다른 비율)
+        rng = np.random.default_rng(seed)
+        self._offsets = rng.random((n_tilings, len(tiles)))
+        self._scale = tiles / (self.high - self.low)
+        self._hash = rng.integers(1, 1 << 31, size=len(tiles) + 1)
+
+    def config(self):
+        return {'kind': self.kind, 'tiles': list(self.tiles), 'n_tilings': self.n_tilings, 'memory_size': self.memory_size,
+                'include_bins': self.include_bins, 'low': self.low.tolist(), 'high': self.high.tolist(), 'seed': self.seed}
+
+    def transform(self, states):
+        states = np.asarray(states, dtype=np.float64).reshape(-1, 5)
+        x = (np.clip(states, self.low, self.high) - self.low) * self._scale        # (N, 5) 타일 단위 좌표
+        coords = np.floor(x[:, None, :] + self._offsets[None]).astype(np.int64)  # (N, T, 5)
+        tiling = np.arange(self.n_tilings, dtype=np.int64)
+        index = (coords @ self._hash[:-1] + tiling * self._hash[-1]) % self.memory_size
+        if self.include_bins:
+            bins = (quantize_states(states) * self._hash[-1] + self.n_tilings) % self.memory_size
+            index = np.concatenate([index, bins[:, None]], axis=1)
+        return index
+
+    def dot(self, weights, phi):
+        """(n_actions, n_features) 가중치 -> (N, n_actions) Q 값"""
+        return weights[:, phi].sum(axis=-1).T
+
+    def add(self, weights, phi, actions, steps):
+        """weights[a] += steps * 특징 (행마다 한 행동)"""
+        np.add.at(weights, (actions[:, None], phi), steps[:, None])
+
+    def step_size(self, alpha):
+        return alpha / self.n_active
+
+
+class RBFFeatures:
+    """원본 상태 -> 정규화한 격자 중심별 가우시안 특징 (N, n_features), 합이 1이 되도록 정규화"""
+    kind = 'rbf'
+
+    def __init__(self, centers=(4, 4, 4, 3, 4), width=1.0, low=STATE_LOW, high=STATE_HIGH):
+        """
+        Args:
+            centers (tuple): 차원별 중심 수 (전체 특징 수 = 곱)
+            width (float): 중심 간격 대비 가우시안 폭
+        """
+        self.centers = tuple(centers)
+        self.width = width
+        self.low = np.asarray(low, dtype=float)
+        self.high = np.asarray(high, dtype=float)
+        grids = np.meshgrid(*[np.linspace(0, 1, n) for n in self.centers], indexing='ij')
+        self._centers = np.stack([g.ravel() for g in grids], axis=1)              # (K, 5)
+        self._inv_var = (np.asarray(self.centers) - 1).clip(1) ** 2 / width ** 2  # 차원별 1 / sigma^2
+        self.n_features = len(self._centers)
+
+    def config(self):
+        return {'kind': self.kind, 'centers': list(self.centers), 'width': self.width,
+                'low': self.low.tolist(), 'high': self.high.tolist()}
+
+    def transform(self, states):
+        states = np.asarray(states, dtype=np.float64).reshape(-1, 5)
+        x = (np.clip(states, self.low, self.high) - self.low) / (self.high - self.low)
+        d2 = ((x[:, None, :] - self._centers[None]) ** 2 * self._inv_var).sum(axis=-1)
+        phi = np.exp(-0.5 * d2)
+        return phi / phi.sum(axis=1, keepdims=True)
+
+    def dot(self, weights, phi):
+        return phi @ weights.T
+
+    def add(self, weights, phi, actions, steps):
+        np.add.at(weights, actions, steps[:, None] * phi)
+
+    def step_size(self, alpha):
+        return alpha
+
+
+def make_features(config):
+    config = dict(config)
+    kind = config.pop('kind')
+    return {'tile': TileCoder, 'rbf': RBFFeatures}[kind](**config)
+
+
+class LinearQAgent:
+    """
+    선형 함수 근사 Q-러닝: Q(s, a) = weights[a] · phi(s), phi는 원본 상태의 타일/RBF 특징.
+    학습 루프에는 QAgent 대신 그대로 넣어서 사용 (agent.quantize_state가 특징을 만듦).
+    learn은 전이를 batch_size개 모았다가 semi-gradient 업데이트를 한 번에 벡터 연산으로 적용.
+    """
+
+    def __init__(self, features=None, n_actions=2, alpha=0.1, gamma=0.95, epsilon=0.1, epsilon_decay=0.0,
+                 epsilon_min=0.01, seed=None, batch_size=16):
+        """
+        Args:
+            features: TileCoder 또는 RBFFeatures (None이면 TileCoder 기본값)
+            alpha (float): 학습률 (타일 코딩은 활성 타일 수로 나눠서 적용)
+            batch_size (int): 몇 개의 전이를 모아서 업데이트할지 (1이면 매 step 업데이트)
+        """
+        self.features = TileCoder() if features is None else features
+        self.n_actions = n_actions
+        self.weights = np.zeros((n_actions, self.features.n_features))
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.epsilon_decay = epsilon_decay
+        self.epsilon_min = epsilon_min
+        self.batch_size = batch_size
+        self.episodes = 0
+        self.rng = UniformStream(seed)
+        self._batch = []
+
+    def quantize_state(self, state):
+        """원본 상태 하나 -> 특징 (1, ...)"""
+        return self.features.transform(state)
+
+    def q_values(self, phi):
+        return self.features.dot(self.weights, phi)
+
+    def choose_action(self, state):
+        if self.rng.random() < self.epsilon:
+            return self.rng.integers(self.n_actions)
+        return int(np.argmax(self.q_values(state)[0]))
+
+    def learn(self, state, action, reward, next_state):
+        self._batch.append((state, action, reward, next_state))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """모아둔 전이로 업데이트"""
+        if not self._batch:
+            return
+        phi, actions, rewards, next_phi = zip(*self._batch)
+        self._batch = []
+        self.update(np.concatenate(phi), np.asarray(actions), np.asarray(rewards, dtype=float), np.concatenate(next_phi))
+
+    def update(self, phi, actions, rewards, next_phi, dones=None):
+        """
+        특징 배치로 semi-gradient Q-러닝 업데이트 한 번
+
+        Args:
+            phi, next_phi: features.transform 결과 (N, ...)
+            actions (ndarray): (N,) int
+            rewards (ndarray): (N,)
+            dones (ndarray): (N,) 종료 전이면 True (다음 상태 가치 0), None이면 모두 False
+
+        Returns:
+            ndarray: (N,) TD 오차
+        """
+        rows = np.arange(len(actions))
+        best_next = self.q_values(next_phi).max(axis=1)
+        if dones is not None:
+            best_next = np.where(dones, 0.0, best_next)
+        td_errors = rewards + self.gamma * best_next - self.q_values(phi)[rows, actions]
+        self.features.add(self.weights, phi, actions, self.features.step_size(self.alpha) * td_errors)
+        return td_errors
+
+    def learn_batch(self, states, actions, rewards, next_states, dones=None):
+        """원본 상태 배치 (VectorWaterParkEnv / 저장된 전이 등)로 업데이트"""
+        features = self.features
+        return self.update(features.transform(states), np.asarray(actions, dtype=np.intp), np.asarray(rewards, dtype=float),
+                           features.transform(next_states), dones)
+
+    def decay_epsilon(self):
+        self.flush()  # 에피소드 경계에서 남은 전이 반영
+        self.epsilon = decayed_epsilon(self.epsilon, self.epsilon_decay, self.epsilon_min)
+
+    def nbytes(self):
+        return self.weights.nbytes
+
+    def save(self, path):
+        """체크포인트 저장: path.npy (weights) + path.json (특징 설정/메타데이터)"""
+        self.flush()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path + '.npy.tmp', 'wb') as f:
+            np.save(f, self.weights)
+        meta = {
+            'features': self.features.config(),
+            'n_actions': self.n_actions,
+            'alpha': self.alpha,
+            'gamma': self.gamma,
+            'epsilon': self.epsilon,
+            'epsilon_decay': self.epsilon_decay,
+            'epsilon_min': self.epsilon_min,
+            'batch_size': self.batch_size,
+            'episodes': self.episodes,
+            'rng': self.rng.get_state(),
+        }
+        with open(path + '.json.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + '.npy.tmp', path + '.npy')
+        os.replace(path + '.json.tmp', path + '.json')
+
+    def restore(self, path):
+        with open(path + '.json') as f:
+            meta = json.load(f)
+        self.features = make_features(meta['features'])
+        self.weights = np.load(path + '.npy')
+        for key in ('n_actions', 'alpha', 'gamma', 'epsilon', 'epsilon_decay', 'epsilon_min', 'batch_size', 'episodes'):
+            setattr(self, key, meta[key])
+        self.rng.set_state(meta['rng'])
+        self._batch = []
+        return self
+
+    @classmethod
+    def load(cls, path):
+        return cls().restore(path)
+
+    def q_snapshot(self):
+        """수렴 판정용 특징별 가중치 (n_features, n_actions) 복사본 (QAgent.q_snapshot과 같은 형식, 특징 하나 = 셀 하나)"""
+        self.flush()
+        return None, self.weights.T.copy()
+
+    def greedy_policy(self):
+        """현재 weights를 고정한 그리디 정책 (원본 상태를 받음 -> quantize=False로 평가)"""
+        return LinearGreedyPolicy(self.weights.copy(), self.features)
+
+
+class LinearGreedyPolicy:
+    deterministic = True
+
+    def __init__(self, weights, features):
+        self.weights = weights
+        self.features = features
+
+    def choose_action(self, state):
+        return int(np.argmax(self.features.dot(self.weights, self.features.transform(state))[0]))
+
+    def choose_actions(self, states):
+        return np.argmax(self.features.dot(self.weights, self.features.transform(states)), axis=1).astype(np.int8)
+
+    def cache_key(self):
+        config = json.dumps(self.features.config(), sort_keys=True).encode()
+        return 'LinearGreedyPolicy:' + hashlib.sha1(self.weights.tobytes() + config).hexdigest()
@@ -0,0 +1,174 @@
+import csv
+import os
+from collections import deque
+
+from matplotlib.figure import Figure  # pyplot 없이 파일로 저장 (디스플레이 불필요)
+
+FIELDS = ('reward', 'replace', 'safe')
+
+
+class WindowStats:
+    """최근 window개 값의 평균/최소/최대 (메모리 O(window), 갱신 O(1) amortized)"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self._min = deque()  # 단조 증가 (index, value)
+        self._max = deque()  # 단조 감소 (index, value)
+        self.count = 0
+
+    def push(self, value):
+        index = self.count
+        self.count += 1
+        self.values.append(value)
+        self.total += value
+        if len(self.values) > self.window:
+            self.total -= self.values.popleft()
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((index, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((index, value))
+        oldest = index - self.window + 1
+        if self._min[0][0] < oldest:
+            self._min.popleft()
+        if self._max[0][0] < oldest:
+            self._max.popleft()
+
+    @property
+    def mean(self):
+        return self.total / len(self.values) if self.values else float('nan')
+
+    @property
+    def min(self):
+        return self._min[0][1] if self._min else float('nan')
+
+    @property
+    def max(self):
+        return self._max[0][1] if self._max else float('nan')
+
+
+class MetricsSink:
+    """
+    에피소드별 지표(reward, replace, safe)를 리스트에 쌓지 않고
+    구간 통계만 메모리에 유지하면서 chunk_size개씩 CSV 로그에 기록.
+    """
+
+    def __init__(self, path=None, window=50, chunk_size=1000):
+        """
+        Args:
+            path (str): CSV 로그 경로 (None이면 기록 안 함)
+            window (int): 이동 통계 구간 크기
+            chunk_size (int): 몇 에피소드마다 파일에 쓸지
+        """
+        self.path = path
+        self.window = window
+        self.chunk_size = chunk_size
+        self.stats = {field: WindowStats(window) for field in FIELDS}
+        self.episodes = 0
+        self.totals = {field: 0.0 for field in FIELDS}
+        self._rows = []
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w', newline='') as f:
+                csv.writer(f).writerow(('episode',) + FIELDS)
+
+    def record(self, reward, replace, safe=True):
+        values = (float(reward), int(replace), int(bool(safe)))
+        for field, value in zip(FIELDS, values):
+            self.stats[field].push(value)
+            self.totals[field] += value
+        self.episodes += 1
+        if self.path is not None:
+            self._rows.append((self.episodes,) + values)
+            if len(self._rows) >= self.chunk_size:
+                self.flush()
+
+    def flush(self):
+        if self.path is None or not self._rows:
+            return
+        with open(self.path, 'a', newline='') as f:
+            csv.writer(f).writerows(self._rows)
+        self._rows = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def summary(self):
+        """최근 window 통계 + 전체 평균"""
+        reward, replace, safe = (self.stats[field] for field in FIELDS)
+        n = max(self.episodes, 1)
+        return {
+            'episodes': self.episodes,
+            'reward_mean': reward.mean,
+            'reward_min': reward.min,
+            'reward_max': reward.max,
+            'replace_mean': replace.mean,
+            'safety_rate': safe.mean,
+            'reward_mean_all': self.totals['reward'] / n,
+            'replace_mean_all': self.totals['replace'] / n,
+            'safety_rate_all': self.totals['safe'] / n,
+        }
+
+
+def read_moving_average(path, column, window=50, max_points=2000):
+    """
+    CSV 로그를 한 줄씩 읽으며 이동 평균 계산 (최대 max_points개만 남김)
+
+    Returns:
+        (episodes, values): 그래프용 리스트
+    """
+    with open(path, newline='') as f:
+        n_rows = sum(1 for _ in f) - 1
+    stride = max(1, (n_rows - window + 1) // max_points)
+
+    episodes, values = [], []
+    recent = deque()
+    total = 0.0
+    with open(path, newline='') as f:
+        for i, row in enumerate(csv.DictReader(f)):
+            value = float(row[column])
+            recent.append(value)
+            total += value
+            if len(recent) > window:
+                total -= recent.popleft()
+            if len(recent) == window and (i - window + 1) % stride == 0:
+                episodes.append(int(row['episode']))
+                values.append(total / window)
+    return episodes, values
+
+
+PANELS = (
+    ('reward', "Policy Performance Comparison", "Mean Total Reward (Moving Average)"),
+    ('replace', "Resource Usage Comparison", "Water Replacement Count (Moving Average)"),
+)
+
+
+def plot_logs(logs, out_path, window=50, panels=PANELS):
+    """
+    여러 CSV 로그를 panel별 subplot으로 그려서 파일로 저장
+
+    Args:
+        logs (dict): {라벨: 로그 경로}
+        out_path (str): 저장할 이미지 경로
+        panels (tuple): (로그 컬럼, 제목, y축 라벨) 목록
+    """
+    fig = Figure(figsize=(7 * len(panels), 5))
+    axes = fig.subplots(1, len(panels), squeeze=False)
+    for ax, (column, title, ylabel) in zip(axes[0], panels):
+        for label, path in logs.items():
+            ax.plot(*read_moving_average(path, column, window), label=label)
+        ax.set_title(title)
+        ax.set_xlabel("Episode")
+        ax.set_ylabel(ylabel)
+        ax.legend()
+    fig.tight_layout()
+    fig.savefig(out_path)
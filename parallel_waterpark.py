@@ -0,0 +1,184 @@
+"""
+공유 메모리 Q-table을 여러 프로세스가 잠금 없이 동시에 갱신하는 Hogwild 방식 병렬 학습.
+
+각 워커는 자기 환경/난수로 에피소드를 돌면서 공유 Q_table에 바로 QAgent.learn을 적용하고,
+코디네이터(메인 프로세스)는 전체 에피소드 수에 맞춰 epsilon을 감소시키고 주기적으로 그리디 정책을 평가.
+
+사용법:
+    python parallel_waterpark.py --workers 4 --episodes 10000
+"""
+import argparse
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from agent_waterpark import QAgent, CompiledGreedyPolicy, STATE_SHAPE
+from rng_waterpark import spawn_seeds
+
+# 공유 메모리의 Q_table 뒤에 붙는 제어 배열 [epsilon, 중단 플래그, 워커별 완료 에피소드 수...]
+_EPSILON, _STOP, _COUNTS = 0, 1, 2
+
+
+def _attach(name, shape, n_workers):
+    shm = shared_memory.SharedMemory(name=name)
+    q = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    control = np.ndarray(_COUNTS + n_workers, dtype=np.float64, buffer=shm.buf, offset=q.nbytes)
+    return shm, q, control
+
+
+def _make_env(csv_path, seed):
+    if csv_path is None:
+        from env_waterpark import WaterParkEnv
+        return WaterParkEnv(return_info=False, seed=seed)
+    from env_waterpark_fixed import WaterParkEnv
+    return WaterParkEnv(csv_path, return_info=False)
+
+
+def _train_fn(csv_path):
+    # 고정 환경은 train_waterpark_fixed, 확률 환경은 train_waterpark의 학습 루프 (보너스만 다름)
+    if csv_path is None:
+        from train_waterpark import train_qlearning_full
+        return train_qlearning_full
+    from train_waterpark_fixed import train_qlearning
+    return train_qlearning
+
+
+def _worker(worker_id, name, shape, n_workers, config, csv_path, seed, episodes):
+    shm, q, control = _attach(name, shape, n_workers)
+    agent = None
+    try:
+        env_seed, agent_seed = seed.spawn(2)
+        env = _make_env(csv_path, env_seed)
+        agent = QAgent(shape[:-1], shape[-1], **config, seed=agent_seed)
+        agent.Q_table = q  # 복사 없이 공유 Q_table에 바로 learn (잠금 없음)
+        train = _train_fn(csv_path)
+        counts = control[_COUNTS:]
+        # 전체 에피소드 수를 워커가 직접 확인 (코디네이터가 평가 중이어도 예산에서 멈춤)
+        while not control[_STOP] and counts.sum() < episodes:
+            agent.epsilon = control[_EPSILON]  # epsilon은 코디네이터가 관리
+            train(env, agent, 1)
+            control[_COUNTS + worker_id] += 1  # 자기 칸만 씀
+    finally:
+        # 공유 버퍼를 참조하는 배열을 모두 놓아야 close 가능 (초기화 중 실패했어도 close)
+        if agent is not None:
+            agent.Q_table = None
+        counts = None
+        del q, control
+        shm.close()
+
+
+def _evaluate(q, csv_path, episodes, seed):
+    policy = CompiledGreedyPolicy.from_q_table(q.copy())
+    if csv_path is None:
+        from train_waterpark import run_policy_full
+        rewards = run_policy_full(_make_env(None, seed), policy, quantize=True, episodes=episodes)[0]
+    else:
+        from train_waterpark_fixed import evaluator
+        rewards = evaluator.evaluate(_make_env(csv_path, seed), policy, quantize=True, episodes=1)[0]
+    return float(np.mean(rewards))
+
+
+def train_hogwild(n_workers=None, episodes=10000, csv_path=None, config=None, state_shape=STATE_SHAPE, n_actions=2,
+                  seed=0, eval_every=1000, eval_episodes=200, poll_interval=0.05):
+    """
+    n_workers개 프로세스로 공유 Q_table 하나를 학습
+
+    Args:
+        n_workers (int): 워커 프로세스 수 (None이면 CPU 코어 수)
+        episodes (int): 모든 워커 합계 학습 에피소드 수 (워커가 매 에피소드 전에 확인, 동시에 진행 중이던 에피소드만큼(최대 n_workers - 1) 넘을 수 있음)
+        csv_path (str): 고정 환경 CSV (None이면 확률 환경)
+        config (dict): QAgent 설정 (alpha, gamma, epsilon, epsilon_decay, epsilon_min)
+        seed (int): 워커별 시드를 나눌 기준 시드
+        eval_every (int): 몇 에피소드마다 그리디 정책을 평가할지
+        eval_episodes (int): 확률 환경 평가 에피소드 수
+        poll_interval (float): 코디네이터 확인 주기 (초)
+
+    Returns:
+        agent (QAgent): 학습된 Q_table 복사본을 가진 에이전트
+        history (list): 평가 시점별 {'elapsed', 'episodes', 'epsilon', 'greedy_reward'}
+    """
+    n_workers = n_workers or mp.cpu_count()
+    config = dict({'alpha': 0.1, 'gamma': 0.95, 'epsilon': 0.1, 'epsilon_decay': 0.9995, 'epsilon_min': 0.001},
+                  **(config or {}))
+    shape = tuple(state_shape) + (n_actions,)
+    q_bytes = int(np.prod(shape)) * 8
+    shm = shared_memory.SharedMemory(create=True, size=q_bytes + 8 * (_COUNTS + n_workers))
+    q = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    control = np.ndarray(_COUNTS + n_workers, dtype=np.float64, buffer=shm.buf, offset=q_bytes)
+    q[:] = 0.0
+    control[:] = 0.0
+    control[_EPSILON] = config['epsilon']
+
+    workers = [
+        mp.Process(target=_worker, args=(i, shm.name, shape, n_workers, config, csv_path, worker_seed, episodes), daemon=True)
+        for i, worker_seed in enumerate(spawn_seeds(seed, n_workers))
+    ]
+    _train_fn(csv_path)  # 평가 모듈을 워커 시작 전에 import (첫 평가가 import로 늦어지지 않도록)
+    history = []
+    start = time.perf_counter()
+    try:
+        for worker in workers:
+            worker.start()
+        next_eval = eval_every
+
+        def record(total, epsilon):
+            history.append({
+                'elapsed': time.perf_counter() - start,
+                'episodes': total,
+                'epsilon': epsilon,
+                'greedy_reward': _evaluate(q, csv_path, eval_episodes, seed),
+            })
+            print(f"Episode {total} / {history[-1]['elapsed']:.1f}s / Epsilon: {epsilon:.4f}"
+                  f" / Greedy: {history[-1]['greedy_reward']:.2f}")
+
+        while True:
+            time.sleep(poll_interval)
+            total = int(control[_COUNTS:].sum())
+            # QAgent.decay_epsilon을 total번 적용한 값
+            epsilon = config['epsilon']
+            if epsilon > config['epsilon_min']:
+                epsilon = max(epsilon * config['epsilon_decay'] ** total, config['epsilon_min'])
+            control[_EPSILON] = epsilon
+            if total >= episodes or not any(worker.is_alive() for worker in workers):
+                break
+            if total >= next_eval:
+                record(total, epsilon)  # 평가 중에도 워커는 각자 예산을 확인하며 계속 학습
+                next_eval = (total // eval_every + 1) * eval_every
+        # 중단 후 모든 워커가 끝난 Q_table로 마지막 평가
+        control[_STOP] = 1
+        for worker in workers:
+            worker.join()
+        if any(worker.exitcode != 0 for worker in workers):
+            raise RuntimeError(f"워커 비정상 종료: {[worker.exitcode for worker in workers]}")
+        record(int(control[_COUNTS:].sum()), float(control[_EPSILON]))
+
+        agent = QAgent(tuple(state_shape), n_actions, **config)
+        agent.Q_table = q.copy()
+        agent.epsilon = float(control[_EPSILON])
+        agent.episodes = int(control[_COUNTS:].sum())
+        return agent, history
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+        del q, control
+        shm.close()
+        shm.unlink()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="공유 메모리 Hogwild Q-러닝")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, mp.cpu_count()], help="비교할 워커 수 목록")
+    parser.add_argument('--episodes', type=int, default=10000)
+    parser.add_argument('--csv', default=None, help="고정 환경 CSV (기본: 확률 환경)")
+    parser.add_argument('--eval-every', type=int, default=1000)
+    args = parser.parse_args()
+
+    for n in dict.fromkeys(args.workers):
+        print(f"▶ workers {n}")
+        agent, history = train_hogwild(n, args.episodes, args.csv, eval_every=args.eval_every)
+        last = history[-1]
+        print(f"  {last['episodes']} episodes / {last['elapsed']:.1f}s / {last['episodes'] / last['elapsed']:,.0f} episodes/s"
+              f" / Greedy: {last['greedy_reward']:.2f}")
@@ -0,0 +1,91 @@
+import json
+import marshal
+from time import perf_counter
+
+# 학습 루프에서 측정하는 구간
+PHASES = ('choose_action', 'env.step', 'quantize_state', 'learn', 'safety_check')
+
+
+class PhaseProfiler:
+    """
+    학습 루프 구간별 누적 시간/호출 횟수 측정기 (opt-in).
+    학습 함수에 profiler=None이면 측정 코드는 bool 확인만 하고 넘어감.
+
+    사용:
+        t = perf_counter()
+        ... 구간 실행 ...
+        t = profiler.add('env.step', t)   # 누적 후 현재 시각 반환 (다음 구간 시작점)
+    """
+
+    def __init__(self, report_every=100, source='train_waterpark.py'):
+        """
+        Args:
+            report_every (int): 몇 에피소드마다 처리량을 출력할지 (0이면 출력 안 함)
+            source (str): cProfile 형식 덤프에 기록할 파일 이름
+        """
+        self.report_every = report_every
+        self.source = source
+        self.times = {phase: 0.0 for phase in PHASES}
+        self.calls = {phase: 0 for phase in PHASES}
+        self.episodes = 0
+        self.steps = 0
+        self.started = perf_counter()
+        self._last_report = (self.started, 0, 0)
+
+    def add(self, phase, start):
+        now = perf_counter()
+        self.times[phase] += now - start
+        self.calls[phase] += 1
+        return now
+
+    def episode_end(self, steps, epsilon=None):
+        """에피소드 종료 시 호출, report_every마다 처리량 출력"""
+        self.episodes += 1
+        self.steps += steps
+        if self.report_every and self.episodes % self.report_every == 0:
+            self.report(epsilon)
+
+    def report(self, epsilon=None):
+        now = perf_counter()
+        last_time, last_episodes, last_steps = self._last_report
+        elapsed = max(now - last_time, 1e-12)
+        self._last_report = (now, self.episodes, self.steps)
+        phase_total = sum(self.times.values()) or 1.0
+        shares = " ".join(f"{phase} {self.times[phase] / phase_total:.0%}" for phase in PHASES)
+        eps = f" / Epsilon: {epsilon:.4f}" if epsilon is not None else ""
+        print(f"Episode {self.episodes}{eps} / {(self.steps - last_steps) / elapsed:,.0f} steps/s"
+              f" / {(self.episodes - last_episodes) / elapsed:,.1f} episodes/s / {shares}")
+
+    def summary(self):
+        elapsed = perf_counter() - self.started
+        return {
+            'episodes': self.episodes,
+            'steps': self.steps,
+            'elapsed': elapsed,
+            'steps_per_sec': self.steps / elapsed if elapsed else 0.0,
+            'episodes_per_sec': self.episodes / elapsed if elapsed else 0.0,
+            'phases': {
+                phase: {
+                    'calls': self.calls[phase],
+                    'seconds': self.times[phase],
+                    'us_per_call': 1e6 * self.times[phase] / self.calls[phase] if self.calls[phase] else 0.0,
+                }
+                for phase in PHASES
+            },
+        }
+
+    def save_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def dump_stats(self, path):
+        """
+        pstats/cProfile 덤프 형식으로 저장 (pstats.Stats(path), snakeviz 등으로 열람).
+        각 구간을 (source, 0, 구간 이름) 함수 하나로 기록.
+        """
+        stats = {}
+        for phase in PHASES:
+            calls, seconds = self.calls[phase], self.times[phase]
+            stats[(self.source, 0, phase)] = (calls, calls, seconds, seconds, {})
+        with open(path, 'wb') as f:
+            marshal.dump(stats, f)
@@ -0,0 +1,55 @@
+import numpy as np
+
+
+class UniformStream:
+    """
+    np.random.Generator에서 [0, 1) 난수를 block_size개씩 미리 뽑아두고 하나씩 꺼내 쓰는 스트림.
+    환경/에이전트가 각자 하나씩 가지며, 다 쓰면 다음 블록을 채움.
+    """
+
+    __slots__ = ('rng', 'block_size', '_block', '_pos')
+
+    def __init__(self, seed=None, block_size=1024):
+        """
+        Args:
+            seed: int, SeedSequence, Generator 또는 None (np.random.default_rng에 그대로 전달)
+            block_size (int): 한 번에 미리 뽑는 난수 개수
+        """
+        self.rng = np.random.default_rng(seed)
+        self.block_size = block_size
+        self._block = []
+        self._pos = 0
+
+    def random(self):
+        pos = self._pos
+        if pos == len(self._block):
+            # float 리스트로 보관 -> 꺼낼 때 ndarray 원소 접근 비용 없음
+            self._block = self.rng.random(self.block_size).tolist()
+            pos = 0
+        self._pos = pos + 1
+        return self._block[pos]
+
+    def uniform(self, low, high):
+        return low + (high - low) * self.random()
+
+    def integers(self, n):
+        """0 이상 n 미만 정수"""
+        return int(self.random() * n)
+
+    def get_state(self):
+        """체크포인트용 상태 (Generator 상태 + 남은 블록)"""
+        return {
+            'bit_generator': self.rng.bit_generator.state,
+            'block': list(self._block),
+            'pos': self._pos,
+        }
+
+    def set_state(self, state):
+        self.rng.bit_generator.state = state['bit_generator']
+        self._block = list(state['block'])
+        self._pos = state['pos']
+
+
+def spawn_seeds(seed, n):
+    """병렬 워커용 독립 시드 n개 (SeedSequence.spawn)"""
+    return np.random.SeedSequence(seed).spawn(n)
@@ -0,0 +1,213 @@
+"""
+고정 환경 시나리오 뱅크 생성기.
+시간대별 유입 인원/날씨/휴일 프로필을 분포에서 뽑아 (scenarios, steps, 3) 변화량 배열 하나(.npy)로 저장
+-> env_waterpark_fixed.WaterParkEnv(bank=...)가 memory-map으로 열어 시나리오 번호로 선택/순회.
+
+사용법:
+    python scenario_waterpark.py --n 5000 --out banks/scenarios.npy
+"""
+import argparse
+import csv
+import json
+import os
+
+import numpy as np
+
+from trace_waterpark import TRACE_COLUMNS, load_bank
+
+# create_csv.py의 기준 프로필 (fixed_env_changes2.csv)
+BASE_INFLUX = (166, 83, 277, 83)      # 시간대별 유입 인원
+STEPS_PER_TIME = (18, 12, 18, 12)     # 시간대별 스텝 수
+MAX_CHANGES = (1.0, 3.0, 3.5)         # 최대 유입일 때 스텝당 변화량 [ammonia, turbidity, pH] (TRACE_COLUMNS 순서)
+
+# 날씨: 맑음 / 흐림 / 비 (비가 오면 유입은 줄고 빗물 때문에 탁도가 스텝마다 더 오름)
+WEATHER = ('sunny', 'cloudy', 'rainy')
+WEATHER_PROBS = (0.5, 0.3, 0.2)
+WEATHER_INFLUX = (1.0, 0.8, 0.5)
+RAIN_TURBIDITY = 0.1
+
+# 휴일 시간대별 유입 배율 (오전/저녁에도 붐빔)
+HOLIDAY_INFLUX = (1.5, 1.8, 1.2, 1.6)
+
+# 시나리오별 파라미터 (뱅크 옆 .json에 열 단위로 저장)
+PARAM_DTYPE = np.dtype([('influx_scale', np.float64), ('holiday', np.bool_), ('weather', np.int8)])
+
+
+def profile_trace(influx_per_time=BASE_INFLUX, steps_per_time=STEPS_PER_TIME, max_changes=MAX_CHANGES,
+                  reference_influx=None, decimals=2):
+    """
+    시간대별 유입 인원 -> (steps, 3) 변화량 배열 (create_csv.py와 같은 계산)
+
+    Args:
+        reference_influx (float): 최대 변화량에 해당하는 유입 인원 (None이면 influx_per_time의 최댓값)
+        decimals (int): 시간대별 변화량 반올림 자릿수 (None이면 반올림 X)
+
+    Returns:
+        ndarray: 스텝별 [ammonia, turbidity, pH] 변화량
+    """
+    reference = max(influx_per_time) if reference_influx is None else reference_influx
+    changes = [[m * (i / reference) for m in max_changes] for i in influx_per_time]
+    if decimals is not None:
+        changes = [[round(c, decimals) for c in row] for row in changes]
+    return np.repeat(np.array(changes, dtype=np.float64), steps_per_time, axis=0)
+
+
+def write_trace_csv(trace, csv_path):
+    """(steps, 3) 변화량 배열 -> fixed_env_changes*.csv 형식"""
+    order = [TRACE_COLUMNS.index(col) for col in ('pH_change', 'turbidity_change', 'ammonia_change')]
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['step', 'pH_change', 'turbidity_change', 'ammonia_change'])
+        for step, row in enumerate(np.asarray(trace).tolist()):
+            writer.writerow([step + 1] + [row[j] for j in order])
+
+
+def sample_params(n, rng, influx_sigma=0.25, holiday_prob=2 / 7, weather_probs=WEATHER_PROBS):
+    """
+    시나리오 파라미터 n개 샘플링
+
+    Args:
+        influx_sigma (float): 유입 배율 로그정규분포 표준편차 (중앙값 1.0, 0.5 ~ 2.0으로 자름)
+        holiday_prob (float): 휴일 확률
+        weather_probs (tuple): WEATHER별 확률
+
+    Returns:
+        ndarray: PARAM_DTYPE (n,)
+    """
+    params = np.empty(n, dtype=PARAM_DTYPE)
+    params['influx_scale'] = np.clip(rng.lognormal(0.0, influx_sigma, n), 0.5, 2.0)
+    params['holiday'] = rng.random(n) < holiday_prob
+    params['weather'] = rng.choice(len(WEATHER), size=n, p=weather_probs)
+    return params
+
+
+def scenario_traces(params, rng, noise_sd=0.1, decimals=2):
+    """
+    파라미터 -> (n, steps, 3) 변화량. 스텝마다 유입 인원에 (1 + noise_sd * N(0, 1)) 잡음을 곱함.
+    기준 유입(max(BASE_INFLUX))에서 MAX_CHANGES -> influx_scale이 곧 변화량 배율.
+    """
+    slot_influx = np.asarray(BASE_INFLUX, dtype=np.float64) * params['influx_scale'][:, None]
+    slot_influx *= np.asarray(WEATHER_INFLUX)[params['weather']][:, None]
+    slot_influx[params['holiday']] *= HOLIDAY_INFLUX
+    influx = np.repeat(slot_influx, STEPS_PER_TIME, axis=1)  # (n, steps)
+    if noise_sd:
+        influx *= np.clip(1.0 + noise_sd * rng.standard_normal(influx.shape), 0.0, None)
+
+    traces = influx[:, :, None] * (np.asarray(MAX_CHANGES) / max(BASE_INFLUX))
+    traces[params['weather'] == WEATHER.index('rainy'), :, TRACE_COLUMNS.index('turbidity_change')] += RAIN_TURBIDITY
+    if decimals is not None:
+        traces = np.round(traces, decimals)
+    return traces
+
+
+def bank_meta_path(bank_path):
+    return os.path.splitext(bank_path)[0] + '.json'
+
+
+def generate_bank(bank_path, n_scenarios, seed=0, chunk_size=4096, noise_sd=0.1, decimals=2, **dist):
+    """
+    시나리오 n_scenarios개를 chunk_size개씩 만들어 .npy 뱅크에 바로 씀 (전체를 메모리에 올리지 않음)
+    + 같은 이름의 .json에 생성 설정과 시나리오별 파라미터 저장.
+    같은 seed면 chunk_size와 무관하게 같은 뱅크.
+
+    Args:
+        bank_path (str): 저장할 .npy 경로
+        dist: sample_params 분포 설정 (influx_sigma, holiday_prob, weather_probs)
+
+    Returns:
+        ndarray: 저장한 뱅크 (load_bank, 읽기 전용 memory-map)
+    """
+    os.makedirs(os.path.dirname(bank_path) or '.', exist_ok=True)
+    rng = np.random.default_rng(seed)
+    params = sample_params(n_scenarios, rng, **dist)
+    steps = sum(STEPS_PER_TIME)
+
+    tmp_path = bank_path + '.tmp'
+    bank = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float64, shape=(n_scenarios, steps, len(TRACE_COLUMNS)))
+    for start in range(0, n_scenarios, chunk_size):
+        bank[start:start + chunk_size] = scenario_traces(params[start:start + chunk_size], rng, noise_sd, decimals)
+    bank.flush()
+    del bank
+
+    meta = {
+        'n_scenarios': n_scenarios,
+        'steps': steps,
+        'columns': list(TRACE_COLUMNS),
+        'seed': seed,
+        'noise_sd': noise_sd,
+        'decimals': decimals,
+        'dist': {key: list(value) if isinstance(value, tuple) else value for key, value in dist.items()},
+        'weather': list(WEATHER),
+        'params': {name: params[name].tolist() for name in PARAM_DTYPE.names},
+    }
+    with open(bank_meta_path(bank_path) + '.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, bank_path)
+    os.replace(bank_meta_path(bank_path) + '.tmp', bank_meta_path(bank_path))
+    return load_bank(bank_path)
+
+
+def load_bank_params(bank_path):
+    """generate_bank가 저장한 시나리오별 파라미터 (PARAM_DTYPE 배열)와 생성 설정"""
+    with open(bank_meta_path(bank_path)) as f:
+        meta = json.load(f)
+    params = np.empty(meta['n_scenarios'], dtype=PARAM_DTYPE)
+    for name in PARAM_DTYPE.names:
+        params[name] = meta['params'][name]
+    return params, meta
+
+
+def evaluate_bank(env, policy, quantize, scenarios=None):
+    """
+    뱅크 환경에서 시나리오마다 1 에피소드씩 평가 (결정론적 정책은 시나리오 해시로 평가 캐시 사용)
+
+    Args:
+        env: WaterParkEnv(bank=...) (scenarios 순서 없이 만든 것)
+        scenarios (sequence): 평가할 시나리오 번호 (None이면 전체)
+
+    Returns:
+        rewards, replaces (ndarray): 시나리오별 총 보상 / 교체 횟수
+    """
+    from train_waterpark_fixed import evaluator
+
+    scenarios = range(env.n_scenarios) if scenarios is None else scenarios
+    rewards, replaces = [], []
+    for scenario in scenarios:
+        env.select(scenario)
+        r, c = evaluator.evaluate(env, policy, quantize=quantize, episodes=1)
+        rewards.append(r[0])
+        replaces.append(c[0])
+    return np.array(rewards), np.array(replaces)
+
+
+if __name__ == "__main__":
+    from env_waterpark_fixed import WaterParkEnv
+    from agent_waterpark import QAgent, FixedIntervalPolicy
+    from train_waterpark_fixed import train_qlearning
+
+    parser = argparse.ArgumentParser(description="고정 환경 시나리오 뱅크 생성 및 학습/평가 데모")
+    parser.add_argument('--n', type=int, default=5000, help="시나리오 수")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='banks/scenarios.npy')
+    parser.add_argument('--episodes', type=int, default=5000, help="데모 학습 에피소드 수 (0이면 생성만)")
+    args = parser.parse_args()
+
+    bank = generate_bank(args.out, args.n, seed=args.seed)
+    params, _ = load_bank_params(args.out)
+    print(f"▶ {args.out}: {bank.shape} / {os.path.getsize(args.out) / 1e6:.1f} MB")
+    for w, name in enumerate(WEATHER):
+        print(f"  {name}: {np.mean(params['weather'] == w):.1%}", end='')
+    print(f" / holiday: {params['holiday'].mean():.1%} / influx_scale: {params['influx_scale'].mean():.2f}")
+
+    if args.episodes:
+        # 앞 80% 시나리오를 섞어서 순회하며 학습, 나머지 20%로 평가
+        split = int(args.n * 0.8)
+        order = np.random.default_rng(args.seed).permutation(split)
+        agent = QAgent(epsilon=0.1, epsilon_decay=0.9995, epsilon_min=0.01)
+        train_qlearning(WaterParkEnv(bank=args.out, scenarios=order, return_info=False), agent, args.episodes)
+
+        held_out = range(split, args.n)
+        env = WaterParkEnv(bank=args.out, return_info=False)
+        greedy, _ = evaluate_bank(env, agent.greedy_policy(), quantize=True, scenarios=held_out)
+        fixed, _ = evaluate_bank(env, FixedIntervalPolicy(), quantize=False, scenarios=held_out)
+        print(f"▶ 평가 시나리오 {len(held_out)}개 평균 보상 / Greedy: {greedy.mean():.2f} / Fixed: {fixed.mean():.2f}")
@@ -0,0 +1,173 @@
+import math
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from env_waterpark_fixed import WaterParkEnv
+from agent_waterpark import QAgent
+from train_waterpark_fixed import CSV_LIST, evaluator, train_qlearning
+
+# 탐색 범위: 이름 -> (최솟값, 최댓값, 로그 스케일 여부)
+SEARCH_SPACE = {
+    'alpha': (0.01, 0.5, True),
+    'gamma': (0.8, 0.999, False),
+    'epsilon': (0.02, 0.3, True),
+    'epsilon_decay': (0.99, 0.9999, False),
+    'epsilon_min': (0.001, 0.05, True),
+    'replace_penalty': (-0.8, -0.1, False),
+}
+
+# QAgent가 아닌 학습 환경에 들어가는 설정
+ENV_PARAMS = ('replace_penalty',)
+
+
+def sample_configs(n, space=SEARCH_SPACE, seed=None):
+    """탐색 범위에서 설정 n개를 무작위 추출"""
+    rng = np.random.default_rng(seed)
+    configs = []
+    for _ in range(n):
+        config = {}
+        for name, (low, high, log) in space.items():
+            if log:
+                config[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+            else:
+                config[name] = float(rng.uniform(low, high))
+        configs.append(config)
+    return configs
+
+
+def run_trial(trial):
+    """
+    설정 하나를 budget 에피소드까지 학습 후 그리디 정책 평가 (워커 프로세스에서 호출).
+    체크포인트에서 이어서 학습하므로 다음 라운드에서는 늘어난 만큼만 추가로 학습.
+
+    replace_penalty는 학습 환경에만 적용하고, 평가는 기본 보상 환경에서 해서 설정끼리 비교 가능하게 함.
+
+    Returns:
+        dict: trial + greedy_reward, greedy_replaces, trained (이번 라운드에 학습한 에피소드 수),
+              resumed (체크포인트에서 이어서 학습했는지, 출력은 부모 프로세스에서)
+    """
+    config = trial['config']
+    env_config = {name: config[name] for name in ENV_PARAMS if name in config}
+    agent_config = {name: value for name, value in config.items() if name not in ENV_PARAMS}
+
+    env = WaterParkEnv(trial['scenario'], return_info=False, **env_config)
+    entropy = [trial['seed'], trial['trial_id'], *trial['scenario'].encode()]
+    agent = QAgent(**agent_config, seed=np.random.SeedSequence(entropy))
+    resumed = os.path.exists(trial['checkpoint'] + '.json')
+    train_qlearning(env, agent, trial['budget'], checkpoint=trial['checkpoint'],
+                    checkpoint_every=trial['budget'], resume=True, verbose=False)
+
+    eval_env = WaterParkEnv(trial['scenario'], return_info=False)
+    rewards, replaces = evaluator.evaluate(eval_env, agent.greedy_policy(), quantize=True, episodes=1)
+    return dict(trial, greedy_reward=float(rewards[0]), greedy_replaces=float(replaces[0]),
+                trained=trial['budget'] - trial['start'], resumed=resumed)
+
+
+def rank_key(result):
+    """그리디 보상이 높은 순, 같으면 교체 횟수가 적은 순"""
+    return (-result['greedy_reward'], result['greedy_replaces'])
+
+
+def successive_halving(scenarios=CSV_LIST, n_configs=27, min_episodes=100, max_episodes=2700, eta=3,
+                       space=SEARCH_SPACE, seed=0, max_workers=None, executor=None):
+    """
+    시나리오별 successive halving 탐색.
+    설정 n_configs개를 min_episodes만큼 학습 -> 상위 1/eta만 남기고 예산을 eta배로 늘려 이어서 학습,
+    max_episodes에 도달하거나 1개가 남을 때까지 반복. 모든 시나리오의 작업을 한 프로세스 풀에서 병렬 실행.
+
+    Args:
+        scenarios (list): 변화량 CSV 목록
+        n_configs (int): 처음 샘플링할 설정 수
+        min_episodes (int): 첫 라운드 학습 에피소드 수
+        max_episodes (int): 마지막 라운드 최대 학습 에피소드 수
+        eta (int): 라운드마다 남기는 비율의 역수 / 예산 증가 배수
+        space (dict): 탐색 범위 (SEARCH_SPACE 형식)
+        seed (int): 설정 샘플링/에이전트 시드
+        max_workers (int): 프로세스 수 (None이면 CPU 코어 수)
+        executor: 재사용할 Executor (None이면 새로 생성)
+
+    Returns:
+        dict: {시나리오: 마지막 라운드 결과 목록 (rank_key 순)}
+        list: 라운드별 전체 결과 (history)
+    """
+    configs = sample_configs(n_configs, space, seed)
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+    history = []
+    try:
+        with tempfile.TemporaryDirectory(prefix='waterpark_search_') as checkpoint_dir:
+            alive = {
+                scenario: [
+                    {
+                        'scenario': scenario,
+                        'trial_id': i,
+                        'seed': seed,
+                        'config': config,
+                        'checkpoint': os.path.join(checkpoint_dir, f"{os.path.splitext(os.path.basename(scenario))[0]}_{i}"),
+                    }
+                    for i, config in enumerate(configs)
+                ]
+                for scenario in scenarios
+            }
+            start, budget = 0, min_episodes
+            n_alive = n_configs
+            while True:
+                trials = [dict(trial, start=start, budget=budget) for trials in alive.values() for trial in trials]
+                results = list(executor.map(run_trial, trials))
+                history.append(results)
+                print(f"라운드 {len(history)}: 설정 {len(results)}개 / 에피소드 {start} -> {budget}"
+                      f" / 체크포인트에서 이어서 학습 {sum(r['resumed'] for r in results)}개")
+                ranked = {scenario: sorted((r for r in results if r['scenario'] == scenario), key=rank_key)
+                          for scenario in alive}
+                if budget >= max_episodes or n_alive == 1:
+                    return ranked, history
+                n_alive = max(1, math.ceil(n_alive / eta))
+                alive = {scenario: [{k: r[k] for k in ('scenario', 'trial_id', 'seed', 'config', 'checkpoint')}
+                                    for r in ranked[scenario][:n_alive]]
+                         for scenario in ranked}
+                start, budget = budget, min(budget * eta, max_episodes)
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+
+def hyperband(scenarios=CSV_LIST, min_episodes=100, max_episodes=2700, eta=3, space=SEARCH_SPACE, seed=0, max_workers=None):
+    """
+    Hyperband: 처음 설정 수/예산이 다른 successive halving(bracket)을 여러 번 실행해서
+    시나리오별로 가장 좋은 결과를 고름
+
+    Returns:
+        dict: {시나리오: 최고 결과}
+    """
+    s_max = int(round(math.log(max_episodes / min_episodes, eta)))
+    best = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for s in range(s_max, -1, -1):
+            n_configs = int(math.ceil((s_max + 1) / (s + 1) * eta ** s))
+            ranked, _ = successive_halving(scenarios, n_configs, max_episodes // eta ** s, max_episodes, eta,
+                                           space, seed + s, executor=executor)
+            for scenario, results in ranked.items():
+                if scenario not in best or rank_key(results[0]) < rank_key(best[scenario]):
+                    best[scenario] = results[0]
+    return best
+
+
+def print_best(ranked):
+    print(f"{'scenario':<24}{'episodes':>9}{'greedy':>9}{'replace':>9}  config")
+    for scenario, results in ranked.items():
+        r = results[0] if isinstance(results, list) else results
+        config = " ".join(f"{k}={v:.4g}" for k, v in r['config'].items())
+        print(f"{os.path.basename(scenario):<24}{r['budget']:>9}{r['greedy_reward']:>9.2f}{r['greedy_replaces']:>9.1f}  {config}")
+
+
+if __name__ == "__main__":
+    n_configs, max_episodes = 27, 2700
+    ranked, history = successive_halving(CSV_LIST, n_configs=n_configs, min_episodes=100, max_episodes=max_episodes, eta=3)
+    trained = sum(r['trained'] for results in history for r in results)
+    grid = n_configs * max_episodes * len(CSV_LIST)
+    print(f"라운드 {len(history)}개 / 학습 에피소드 {trained:,} (같은 설정 수를 전부 끝까지 학습하면 {grid:,})")
+    print_best(ranked)
@@ -0,0 +1,273 @@
+"""
+학습된 Q-table로 교체/유지 결정을 내려주는 로컬 asyncio 서버.
+
+프로토콜: 한 줄에 JSON 하나 (TCP localhost 또는 Unix socket)
+    요청: {"id": 1, "states": [[ammonia, turbidity, pH, replace_left, step], ...]}
+          {"id": 2, "state": [ammonia, turbidity, pH, replace_left, step]}
+          {"cmd": "stats"}
+    응답: {"id": 1, "actions": [0, 1, ...], "version": 체크포인트 버전}
+          {"id": 2, "action": 1, "version": ...}
+
+사용법:
+    python serve_waterpark.py checkpoints/waterpark_q                   # 127.0.0.1:8765
+    python serve_waterpark.py checkpoints/waterpark_q --unix /tmp/waterpark.sock
+    python serve_waterpark.py checkpoints/waterpark_q --load-test       # 서버 + 부하 클라이언트 실행 후 지연 시간 출력
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+from agent_waterpark import QAgent
+
+
+class LatencyStats:
+    """최근 window개 요청의 지연 시간 분위수 + 시작 이후 처리량"""
+
+    def __init__(self, window=10000):
+        self.latencies = deque(maxlen=window)
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.states = 0
+        self.batches = 0
+
+    def record_batch(self, latencies, n_states):
+        self.latencies.extend(latencies)
+        self.requests += len(latencies)
+        self.states += n_states
+        self.batches += 1
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        if self.latencies:
+            p50, p99 = np.percentile(np.fromiter(self.latencies, dtype=float), [50, 99]) * 1e3
+        else:
+            p50 = p99 = float('nan')
+        return {
+            'requests': self.requests,
+            'states': self.states,
+            'batches': self.batches,
+            'mean_batch_requests': self.requests / self.batches if self.batches else 0.0,
+            'p50_ms': float(p50),
+            'p99_ms': float(p99),
+            'requests_per_sec': self.requests / elapsed if elapsed else 0.0,
+            'states_per_sec': self.states / elapsed if elapsed else 0.0,
+        }
+
+
+class PolicyServer:
+    """
+    체크포인트의 CompiledGreedyPolicy로 동시에 들어온 요청을 모아서(micro-batch) 한 번에 계산.
+    체크포인트 .json이 바뀌면 다시 불러옴 (QAgent.save는 .npy 다음에 .json을 교체하므로 .json 변경 = 저장 완료).
+    """
+
+    def __init__(self, checkpoint, max_batch=1024, max_delay=0.001, reload_interval=1.0):
+        """
+        Args:
+            checkpoint (str): QAgent.save 경로 (확장자 제외)
+            max_batch (int): 한 배치에 모을 최대 요청 수
+            max_delay (float): 첫 요청 이후 더 모으기 위해 기다리는 최대 시간 (초)
+            reload_interval (float): 체크포인트 변경 확인 주기 (초)
+        """
+        self.checkpoint = checkpoint
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.reload_interval = reload_interval
+        self.stats = LatencyStats()
+        self.policy = None
+        self.version = None
+        self.queue = None
+        self._tasks = []
+        self.reload()
+
+    def reload(self):
+        """체크포인트가 바뀌었으면 정책 교체 (실패 시 이전 정책 유지)"""
+        try:
+            version = os.stat(self.checkpoint + '.json').st_mtime_ns
+        except FileNotFoundError:
+            if self.policy is None:
+                raise
+            return False
+        if version == self.version:
+            return False
+        try:
+            policy = QAgent.load(self.checkpoint).greedy_policy()
+        except (OSError, ValueError, KeyError) as e:
+            if self.policy is None:
+                raise
+            print(f"Reload 실패 (이전 정책 유지): {e}")
+            return False
+        # 배치 사이에서 참조만 교체 -> 진행 중인 배치는 이전 정책으로 끝남
+        self.policy, self.version = policy, version
+        print(f"Loaded: {self.checkpoint} (version {version})")
+        return True
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            self.reload()
+
+    async def _batch_loop(self):
+        queue = self.queue
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(items) < self.max_batch:
+                try:
+                    items.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        items.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+            try:
+                batch = np.concatenate([states for states, _, _ in items])
+                actions = self.policy.choose_actions(batch).tolist()
+            except Exception as e:
+                # 배치 하나가 실패해도 루프는 계속 -> 기다리는 요청에는 예외 전달
+                for _, future, _ in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            version = self.version
+            now = time.perf_counter()
+            offset = 0
+            for states, future, _ in items:
+                n = len(states)
+                if not future.done():
+                    future.set_result((actions[offset:offset + n], version))
+                offset += n
+            self.stats.record_batch([now - received for _, _, received in items], len(batch))
+
+    async def decide(self, states):
+        """
+        Args:
+            states (ndarray): (N, 5) 원본 상태
+
+        Returns:
+            (actions, version): 행동 리스트와 사용한 체크포인트 버전
+
+        Raises:
+            ValueError: states가 (N, 5)가 아닐 때 (큐에 넣기 전에 확인 -> 다른 요청과 같은 배치를 망치지 않음)
+        """
+        states = np.asarray(states, dtype=float)
+        if states.ndim != 2 or states.shape[1] != 5:
+            raise ValueError("state는 [ammonia, turbidity, pH, replace_left, step] 5개 값")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((states, future, time.perf_counter()))
+        return await future
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(json.dumps(await self._respond(line)).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, line):
+        try:
+            request = json.loads(line)
+            if request.get('cmd') == 'stats':
+                return dict(self.stats.summary(), version=self.version)
+            single = 'state' in request
+            states = np.asarray([request['state']] if single else request['states'], dtype=float)
+            actions, version = await self.decide(states)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            return {'error': str(e)}
+        except Exception as e:  # 배치 계산 실패 (_batch_loop가 전달한 예외)
+            return {'error': f"{type(e).__name__}: {e}"}
+        response = {'action': actions[0]} if single else {'actions': actions}
+        if 'id' in request:
+            response['id'] = request['id']
+        response['version'] = version
+        return response
+
+    async def start(self, host='127.0.0.1', port=8765, unix_path=None):
+        self.queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._batch_loop()), asyncio.create_task(self._watch())]
+        if unix_path is not None:
+            return await asyncio.start_unix_server(self.handle, path=unix_path)
+        return await asyncio.start_server(self.handle, host, port)
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+
+
+async def open_client(host='127.0.0.1', port=8765, unix_path=None):
+    if unix_path is not None:
+        return await asyncio.open_unix_connection(unix_path)
+    return await asyncio.open_connection(host, port)
+
+
+async def load_test(server, n_clients=64, n_requests=200, pools_per_request=1, **address):
+    """클라이언트 n_clients개가 각자 n_requests번씩 요청 (요청마다 풀 pools_per_request개)"""
+    rng = np.random.default_rng(0)
+
+    async def client():
+        reader, writer = await open_client(**address)
+        states = np.column_stack([
+            rng.uniform(0, 5, pools_per_request), rng.uniform(0, 5, pools_per_request), rng.uniform(4, 10, pools_per_request),
+            rng.integers(0, 21, pools_per_request), rng.integers(0, 60, pools_per_request),
+        ]).tolist()
+        message = json.dumps({'states': states}).encode() + b'\n'
+        for _ in range(n_requests):
+            writer.write(message)
+            await writer.drain()
+            await reader.readline()
+        writer.close()
+
+    server.stats = LatencyStats()
+    await asyncio.gather(*(client() for _ in range(n_clients)))
+    return server.stats.summary()
+
+
+async def main(args):
+    server = PolicyServer(args.checkpoint, args.max_batch, args.max_delay_ms / 1e3, args.reload_interval)
+    address = {'unix_path': args.unix} if args.unix else {'host': args.host, 'port': args.port}
+    listener = await server.start(**address)
+    async with listener:
+        if args.load_test:
+            summary = await load_test(server, args.clients, args.requests, args.pools, **address)
+            print(json.dumps(summary, indent=2))
+            server.stop()
+            return
+        print(f"Serving {args.checkpoint} on {args.unix or f'{args.host}:{args.port}'}")
+        while True:
+            await asyncio.sleep(args.report_every)
+            s = server.stats.summary()
+            print(f"{s['requests']:,} requests / p50 {s['p50_ms']:.3f} ms / p99 {s['p99_ms']:.3f} ms"
+                  f" / {s['requests_per_sec']:,.0f} req/s / batch {s['mean_batch_requests']:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WaterPark 정책 서빙 서버")
+    parser.add_argument('checkpoint', help="QAgent.save 경로 (확장자 제외)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="Unix socket 경로 (주면 TCP 대신 사용)")
+    parser.add_argument('--max-batch', type=int, default=1024)
+    parser.add_argument('--max-delay-ms', type=float, default=1.0)
+    parser.add_argument('--reload-interval', type=float, default=1.0)
+    parser.add_argument('--report-every', type=float, default=10.0)
+    parser.add_argument('--load-test', action='store_true', help="부하 클라이언트 실행 후 통계 출력하고 종료")
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--pools', type=int, default=1, help="요청 하나에 담는 풀 수")
+    args = parser.parse_args()
+    asyncio.run(main(args))
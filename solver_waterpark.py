@@ -0,0 +1,89 @@
+import sys
+
+from env_waterpark_vector import FIXED_REWARDS
+
+
+def solve_optimal(env, terminal_bonus=0.1):
+    """
+    고정 환경(env_waterpark_fixed.WaterParkEnv)의 최적 교체 스케줄 계산.
+    (수질 상태, replace_left, step)을 키로 메모이제이션한 후방 귀납(backward induction).
+
+    Args:
+        env: env_waterpark_fixed.WaterParkEnv (trace, max_steps, max_replace, replace_penalty 사용)
+        terminal_bonus (float): 에피소드 종료 시 남은 교체 횟수당 보너스 (run_policy와 동일)
+
+    Returns:
+        value (float): 최적 총 보상 (보너스 포함)
+        schedule (list): 스텝별 최적 행동 (0 = 유지 / 1 = 교체)
+    """
+    trace = env.trace.tolist()
+    last_row = len(trace) - 1
+    max_steps = env.max_steps
+    keep_table = FIXED_REWARDS['keep'].tolist()
+    replace_table = FIXED_REWARDS['replace'].tolist()
+    no_water_penalty = FIXED_REWARDS['no_water_penalty']
+    replace_penalty = env.replace_penalty
+    memo = {}
+
+    # step 이후 변화량이 모두 0 이상이면, 세 기준을 모두 넘은 수질은
+    # 교체 전까지 계속 모두 초과 상태 -> 수질을 None 하나로 합침
+    rising_from = [all(min(row) >= 0 for row in trace[min(step, last_row):]) for step in range(max_steps + 1)]
+
+    def exceed_count(ammonia, turbidity, ph):
+        return int(ammonia > 0.5) + int(turbidity > 2.8) + int(ph < 5.8 or ph > 8.6)
+
+    def transition(ammonia, turbidity, ph, replace_left, step, action):
+        # env_waterpark_fixed.WaterParkEnv.step과 같은 전이/보상
+        reward = 0.0
+        saturated = ammonia is None
+        if action == 1 and replace_left > 0:
+            ammonia, turbidity, ph, replace_left = 0.1, 1.0, 7.2, replace_left - 1
+        elif action == 1:
+            reward += no_water_penalty
+        elif not saturated:
+            ammonia_delta, turbidity_delta, ph_delta = trace[min(step, last_row)]
+            ph = ph + ph_delta
+            turbidity = turbidity + turbidity_delta
+            ammonia = ammonia + ammonia_delta
+        if ammonia is None:
+            count = 3
+        else:
+            count = exceed_count(ammonia, turbidity, ph)
+            if count == 3 and ph > 8.6 and rising_from[step + 1]:
+                ammonia = turbidity = ph = None
+        if action == 1:
+            reward += replace_table[count] + replace_penalty
+        else:
+            reward += keep_table[count]
+        return (ammonia, turbidity, ph, replace_left, step + 1), reward
+
+    def value(key):
+        if key in memo:
+            return memo[key][0]
+        ammonia, turbidity, ph, replace_left, step = key
+        best = None
+        for action in (0, 1):
+            next_key, reward = transition(ammonia, turbidity, ph, replace_left, step, action)
+            if next_key[4] >= max_steps:
+                total = reward + terminal_bonus * next_key[3]
+            else:
+                total = reward + value(next_key)
+            if best is None or total > best[0]:
+                best = (total, action, next_key)
+        memo[key] = best
+        return best[0]
+
+    start = (0.2, 1.5, 7.2, env.max_replace, 0)
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, 4 * max_steps + 100))
+    try:
+        total = value(start)
+    finally:
+        sys.setrecursionlimit(limit)
+
+    schedule = []
+    key = start
+    while key[4] < max_steps:
+        _, action, key = memo[key]
+        schedule.append(action)
+    return float(total), schedule
@@ -0,0 +1,386 @@
+import hashlib
+import json
+import os
+from bisect import bisect_right, insort
+
+import numpy as np
+
+from agent_waterpark import _above, decayed_epsilon
+from rng_waterpark import UniformStream
+
+# 구간 번호를 차원마다 KEY_BITS 비트씩 int64 하나에 묶음 (5차원 * 12비트 = 60비트, 차원당 최대 4096 구간)
+KEY_BITS = 12
+MAX_BINS = 1 << KEY_BITS
+_KEY_MASK = MAX_BINS - 1
+_EMPTY = -1
+_HASH_MUL = 0x9E3779B97F4A7C15  # Fibonacci hashing
+_MASK64 = (1 << 64) - 1
+
+
+def _fine_edges(low, high, width, above=()):
+    """low~high를 width 간격으로 나눈 경계 (above에 있는 값은 '이하'가 아래 구간이 되도록 _above 적용)"""
+    edges = []
+    for value in np.round(np.arange(low, high + width / 2, width), 6).tolist():
+        edges.append(_above(value) if value in above else value)
+    return tuple(edges)
+
+
+# 상태 [ammonia, turbidity, pH, replace_left, step]별 세밀한 구간 경계
+# 마지막 차원은 시간(hour)이 아니라 step 그대로 (10분 단위)
+FINE_BIN_EDGES = (
+    _fine_edges(0.1, 3.0, 0.1, above=(0.5,)),               #ammonia 0.1 단위 (0.5 이하/초과 구분)
+    _fine_edges(0.2, 5.0, 0.2, above=(2.8,)),               #탁도 0.2 단위 (2.8 이하/초과 구분)
+    _fine_edges(5.0, 9.6, 0.2, above=(8.6,)),               #pH 0.2 단위 (5.8 미만 / 8.6 초과 구분)
+    tuple(_above(k) for k in range(20)),                    #남은 교체 횟수 정확히
+    tuple(range(1, 60)),                                    #step(10분) 정확히
+)
+
+# agent_waterpark.BIN_EDGES와 같은 구간 (step 18/30/48 = 12/14/17시)
+COARSE_BIN_EDGES = (
+    (_above(2.8),),
+    (_above(2.8),),
+    (5.8, _above(8.6)),
+    (_above(0), _above(5), _above(10), _above(15)),
+    (18, 30, 48),
+)
+
+
+def pack_states(states, bin_edges):
+    """
+    원본 상태 배치를 키 배열로 변환
+
+    Args:
+        states (ndarray): (N, 5) [ammonia, turbidity, pH, replace_left, step]
+
+    Returns:
+        ndarray: (N,) int64 키
+    """
+    states = np.asarray(states, dtype=np.float64).reshape(-1, len(bin_edges))
+    keys = np.zeros(len(states), dtype=np.int64)
+    for dim, edges in enumerate(bin_edges):
+        bins = np.searchsorted(np.asarray(edges, dtype=np.float64), states[:, dim], side='right')
+        keys |= bins.astype(np.int64) << (KEY_BITS * dim)
+    return keys
+
+
+class SparseQTable:
+    """
+    int64 키 -> Q 값 행(n_actions개)의 open-addressing 해시 테이블 (linear probing).
+    키/슬롯은 길이 capacity(2의 거듭제곱)의 int64/int32 배열, Q 값은 방문한 상태 수만큼만 쌓이는 (size, n_actions) 배열.
+    """
+
+    def __init__(self, n_actions=2, capacity=1024):
+        self.n_actions = n_actions
+        self.size = 0
+        self._allocate(max(8, 1 << (int(capacity) - 1).bit_length()))
+        self.values = np.zeros((self.capacity // 2, n_actions))
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.keys = np.full(capacity, _EMPTY, dtype=np.int64)
+        self.rows = np.zeros(capacity, dtype=np.int32)
+        self._mask = capacity - 1
+        self._shift = 64 - (capacity.bit_length() - 1)
+
+    def _slot(self, key):
+        return ((key * _HASH_MUL) & _MASK64) >> self._shift
+
+    def _slots(self, keys):
+        return ((keys.astype(np.uint64) * np.uint64(_HASH_MUL)) >> np.uint64(self._shift)).astype(np.intp)
+
+    def find(self, key):
+        """키의 행 번호 (없으면 -1)"""
+        keys, mask = self.keys, self._mask
+        i = self._slot(key)
+        while True:
+            k = keys[i]
+            if k == key:
+                return int(self.rows[i])
+            if k == _EMPTY:
+                return -1
+            i = (i + 1) & mask
+
+    def row(self, key):
+        """키의 행 번호 (없으면 0으로 초기화한 행 추가)"""
+        keys, mask = self.keys, self._mask
+        i = self._slot(key)
+        while True:
+            k = keys[i]
+            if k == key:
+                return int(self.rows[i])
+            if k == _EMPTY:
+                break
+            i = (i + 1) & mask
+        row = self.size
+        if row == len(self.values):
+            self.values = np.concatenate([self.values, np.zeros_like(self.values)])
+        keys[i] = key
+        self.rows[i] = row
+        self.size = row + 1
+        if 2 * self.size > self.capacity:  # load factor 0.5 초과 시 확장
+            self._rehash(self.capacity * 2)
+        return row
+
+    def lookup(self, keys):
+        """
+        키 배열의 행 번호 (벡터화, 없는 키는 -1)
+
+        Returns:
+            ndarray: (N,) intp 행 번호
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        result = np.full(len(keys), -1, dtype=np.intp)
+        pending = np.arange(len(keys))
+        slots = self._slots(keys)
+        while len(pending):
+            stored = self.keys[slots]
+            hit = stored == keys[pending]
+            result[pending[hit]] = self.rows[slots[hit]]
+            more = ~hit & (stored != _EMPTY)
+            pending, slots = pending[more], (slots[more] + 1) & self._mask
+        return result
+
+    def _insert_all(self, keys, rows):
+        # 빈 테이블에 서로 다른 키를 한꺼번에 삽입 (충돌한 키만 다음 슬롯으로)
+        slots = self._slots(keys)
+        while len(keys):
+            free = self.keys[slots] == _EMPTY
+            # 같은 빈 슬롯을 노리는 키 중 첫 번째만 차지
+            _, first = np.unique(slots[free], return_index=True)
+            claim = np.flatnonzero(free)[first]
+            self.keys[slots[claim]] = keys[claim]
+            self.rows[slots[claim]] = rows[claim]
+            left = np.ones(len(keys), dtype=bool)
+            left[claim] = False
+            keys, rows, slots = keys[left], rows[left], (slots[left] + 1) & self._mask
+
+    def _rehash(self, capacity):
+        used = self.keys != _EMPTY
+        keys, rows = self.keys[used], self.rows[used]
+        self._allocate(capacity)
+        self._insert_all(keys, rows)
+
+    def items(self):
+        """(키 배열, Q 값 배열) 행 번호 순"""
+        used = self.keys != _EMPTY
+        order = np.argsort(self.rows[used])
+        return self.keys[used][order], self.values[:self.size]
+
+    @classmethod
+    def from_items(cls, keys, values):
+        keys = np.asarray(keys, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        table = cls(values.shape[1], capacity=2 * max(len(keys), 4))
+        table.values = np.array(values, copy=True) if len(values) else table.values
+        table.size = len(keys)
+        table._insert_all(keys, np.arange(len(keys), dtype=np.int32))
+        return table
+
+    def nbytes(self):
+        return self.keys.nbytes + self.rows.nbytes + self.values.nbytes
+
+
+class SparseQAgent:
+    """
+    방문한 상태만 SparseQTable에 저장하는 Q-러닝 에이전트 (세밀한 구간에서도 메모리 = 방문 상태 수에 비례).
+    학습 루프에는 QAgent 대신 그대로 넣어서 사용 (상태 키는 agent.quantize_state가 만듦).
+
+    adaptive=True면 split_dims 차원에서 방문 수가 split_threshold 이상인 구간을
+    관측 값 평균에서 둘로 나눔 (에피소드 종료 시). 부모 구간에 저장된 Q 값은 아래쪽 자식이 그대로 갖고,
+    위쪽 자식은 방문할 때 새로 만듦 (복사하지 않으므로 메모리는 계속 방문한 상태 수에 비례).
+    """
+
+    def __init__(self, bin_edges=FINE_BIN_EDGES, n_actions=2, alpha=0.1, gamma=0.95, epsilon=0.1, epsilon_decay=0.0,
+                 epsilon_min=0.01, seed=None, adaptive=False, split_threshold=5000, split_dims=(0, 1, 2), max_bins=64,
+                 capacity=1024):
+        """
+        Args:
+            bin_edges (tuple): 차원별 구간 경계 (오름차순, 차원당 MAX_BINS - 1개 이하)
+            adaptive (bool): 방문이 많은 구간을 자동으로 나눌지
+            split_threshold (int): 구간을 나누는 방문 수
+            split_dims (tuple): 나눌 수 있는 차원 (기본: 수질 3개)
+            max_bins (int): 나누기를 멈추는 차원당 구간 수
+            capacity (int): 해시 테이블 초기 슬롯 수
+        """
+        if any(len(edges) >= MAX_BINS for edges in bin_edges):
+            raise ValueError(f"차원당 구간 수는 {MAX_BINS}개 이하")
+        self.bin_edges = tuple(list(edges) for edges in bin_edges)
+        self.n_actions = n_actions
+        self.table = SparseQTable(n_actions, capacity)
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.epsilon_decay = epsilon_decay
+        self.epsilon_min = epsilon_min
+        self.episodes = 0
+        self.rng = UniformStream(seed)
+        self.adaptive = adaptive
+        self.split_threshold = split_threshold
+        self.split_dims = tuple(split_dims)
+        self.max_bins = min(max_bins, MAX_BINS)
+        self.splits = 0
+        # 구간별 방문 통계 [횟수, 합, 최솟값, 최댓값] (adaptive일 때만 갱신)
+        self._visits = {dim: [[0, 0.0, np.inf, -np.inf] for _ in range(len(self.bin_edges[dim]) + 1)]
+                        for dim in self.split_dims}
+
+    def quantize_state(self, state):
+        """원본 상태 -> 키 (adaptive면 구간 방문 통계도 갱신)"""
+        key = 0
+        visits = self._visits if self.adaptive else None
+        for dim, (value, edges) in enumerate(zip(state, self.bin_edges)):
+            b = bisect_right(edges, value)
+            key |= b << (KEY_BITS * dim)
+            if visits is not None and dim in visits:
+                stat = visits[dim][b]
+                stat[0] += 1
+                stat[1] += value
+                if value < stat[2]:
+                    stat[2] = value
+                if value > stat[3]:
+                    stat[3] = value
+        return key
+
+    def q_values(self, key):
+        row = self.table.find(key)
+        return self.table.values[row] if row >= 0 else np.zeros(self.n_actions)
+
+    def choose_action(self, state):
+        if self.rng.random() < self.epsilon:
+            return self.rng.integers(self.n_actions)
+        return int(np.argmax(self.q_values(state)))
+
+    def learn(self, state, action, reward, next_state):
+        table = self.table
+        next_row = table.find(next_state)
+        best_next = table.values[next_row].max() if next_row >= 0 else 0.0
+        row = table.row(state)
+        q = table.values[row]
+        q[action] += self.alpha * (reward + self.gamma * best_next - q[action])
+
+    def decay_epsilon(self):
+        # 에피소드 경계에서만 구간을 나눔 (학습 루프가 들고 있는 키가 바뀌지 않도록)
+        if self.adaptive:
+            self.split_bins()
+        self.epsilon = decayed_epsilon(self.epsilon, self.epsilon_decay, self.epsilon_min)
+
+    def split_bins(self):
+        """
+        방문 수가 split_threshold 이상이고 관측 값이 2개 이상 다른 구간을 평균에서 나눔
+
+        Returns:
+            int: 이번에 나눈 구간 수
+        """
+        n_splits = 0
+        for dim in self.split_dims:
+            stats = self._visits[dim]
+            # 뒤쪽 구간부터 나눠야 앞쪽 구간 번호가 그대로 유지됨
+            for b in range(len(stats) - 1, -1, -1):
+                count, total, low, high = stats[b]
+                if count < self.split_threshold or len(self.bin_edges[dim]) + 1 >= self.max_bins:
+                    continue
+                value = total / count
+                if not low < value <= high:
+                    stats[b] = [0, 0.0, np.inf, -np.inf]  # 한 값에 몰려 있어 나눌 수 없음
+                    continue
+                insort(self.bin_edges[dim], value)
+                stats[b:b + 1] = [[0, 0.0, np.inf, -np.inf], [0, 0.0, np.inf, -np.inf]]
+                self._split_table(dim, b)
+                n_splits += 1
+        self.splits += n_splits
+        return n_splits
+
+    def _split_table(self, dim, b):
+        # dim 차원 구간 b가 b, b+1로 나뉨: b보다 큰 구간 번호만 +1 (b에 있던 상태는 아래쪽 자식 b로 남음)
+        keys, values = self.table.items()
+        bins = (keys >> (KEY_BITS * dim)) & _KEY_MASK
+        shift = np.int64(1) << np.int64(KEY_BITS * dim)
+        self.table = SparseQTable.from_items(np.where(bins > b, keys + shift, keys), values)
+
+    @property
+    def n_states(self):
+        return self.table.size
+
+    def dense_nbytes(self):
+        """같은 구간을 dense Q_table로 만들었을 때의 크기 (비교용)"""
+        n_cells = np.prod([len(edges) + 1 for edges in self.bin_edges], dtype=np.float64)
+        return n_cells * self.n_actions * 8
+
+    def save(self, path):
+        """체크포인트 저장: path.npz (키, Q 값) + path.json (구간 경계/설정)"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        keys, values = self.table.items()
+        with open(path + '.npz.tmp', 'wb') as f:
+            np.savez(f, keys=keys, values=values)
+        meta = {
+            'bin_edges': [list(edges) for edges in self.bin_edges],
+            'n_actions': self.n_actions,
+            'alpha': self.alpha,
+            'gamma': self.gamma,
+            'epsilon': self.epsilon,
+            'epsilon_decay': self.epsilon_decay,
+            'epsilon_min': self.epsilon_min,
+            'episodes': self.episodes,
+            'splits': self.splits,
+            'rng': self.rng.get_state(),
+        }
+        with open(path + '.json.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + '.npz.tmp', path + '.npz')
+        os.replace(path + '.json.tmp', path + '.json')
+
+    def restore(self, path):
+        with open(path + '.json') as f:
+            meta = json.load(f)
+        with np.load(path + '.npz') as data:
+            self.table = SparseQTable.from_items(data['keys'], data['values'])
+        self.bin_edges = tuple(list(edges) for edges in meta['bin_edges'])
+        self.n_actions = meta['n_actions']
+        for key in ('alpha', 'gamma', 'epsilon', 'epsilon_decay', 'epsilon_min', 'episodes', 'splits'):
+            setattr(self, key, meta[key])
+        self.rng.set_state(meta['rng'])
+        # 방문 통계는 저장하지 않음 (재시작 후 다시 쌓음)
+        self._visits = {dim: [[0, 0.0, np.inf, -np.inf] for _ in range(len(self.bin_edges[dim]) + 1)]
+                        for dim in self.split_dims}
+        return self
+
+    @classmethod
+    def load(cls, path):
+        return cls().restore(path)
+
+    def q_snapshot(self):
+        """수렴 판정용 (방문한 상태 키 오름차순, Q 값) 복사본 (QAgent.q_snapshot과 같은 형식, 구간을 나누면 키가 바뀜)"""
+        keys, values = self.table.items()
+        order = np.argsort(keys)
+        return keys[order], values[order]
+
+    def greedy_policy(self):
+        """현재 Q 값을 고정한 SparseGreedyPolicy (원본 상태를 받음 -> quantize=False로 평가)"""
+        keys, values = self.table.items()
+        return SparseGreedyPolicy(keys, np.argmax(values, axis=1) if len(values) else np.zeros(0), self.bin_edges)
+
+
+class SparseGreedyPolicy:
+    """방문한 상태의 argmax 행동만 보관한 그리디 정책 (방문 안 한 상태는 행동 0 = 유지)"""
+    deterministic = True
+
+    def __init__(self, keys, actions, bin_edges):
+        self.bin_edges = tuple(tuple(edges) for edges in bin_edges)
+        self.table = SparseQTable.from_items(keys, np.zeros((len(keys), 1)))
+        self.actions = np.asarray(actions, dtype=np.int8)
+        self._action_list = self.actions.tolist()
+
+    def choose_action(self, state):
+        key = 0
+        for dim, (value, edges) in enumerate(zip(state, self.bin_edges)):
+            key |= bisect_right(edges, value) << (KEY_BITS * dim)
+        row = self.table.find(key)
+        return self._action_list[row] if row >= 0 else 0
+
+    def choose_actions(self, states):
+        rows = self.table.lookup(pack_states(states, self.bin_edges))
+        return np.where(rows >= 0, self.actions[rows], 0).astype(np.int8)
+
+    def cache_key(self):
+        keys, _ = self.table.items()
+        digest = hashlib.sha1(keys.tobytes() + self.actions.tobytes() + repr(self.bin_edges).encode()).hexdigest()
+        return 'SparseGreedyPolicy:' + digest
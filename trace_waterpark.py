@@ -0,0 +1,85 @@
+import csv
+import hashlib
+import os
+
+import numpy as np
+
+# CSV 컬럼 -> 상태 순서(ammonia, turbidity, pH)
+TRACE_COLUMNS = ('ammonia_change', 'turbidity_change', 'pH_change')
+
+# 프로세스 내 캐시 (CSV 내용 해시 -> 변화량 배열)
+_TRACE_CACHE = {}
+
+
+def csv_hash(csv_path):
+    """CSV 파일 내용의 sha1 해시"""
+    with open(csv_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def parse_trace(csv_path):
+    """
+    fixed_env_changes*.csv를 (steps, 3) float64 배열로 변환 (pandas 사용 X)
+
+    Returns:
+        ndarray: 스텝별 [ammonia, turbidity, pH] 변화량
+    """
+    with open(csv_path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    trace = np.empty((len(rows), len(TRACE_COLUMNS)), dtype=np.float64)
+    for i, row in enumerate(rows):
+        for j, col in enumerate(TRACE_COLUMNS):
+            trace[i, j] = float(row[col])
+    return trace
+
+
+def load_trace(csv_path, cache_dir=None, digest=None):
+    """
+    변화량 배열을 한 번만 만들어 재사용
+
+    Args:
+        csv_path (str): 변화량 CSV 파일
+        cache_dir (str): 지정하면 <해시>.npy로 저장하고 memory-map으로 읽음
+        digest (str): 이미 계산한 csv_hash(csv_path) (None이면 여기서 계산)
+
+    Returns:
+        ndarray: (steps, 3) 읽기 전용 변화량 배열
+    """
+    key = csv_hash(csv_path) if digest is None else digest
+    trace = _TRACE_CACHE.get(key)
+    if trace is not None:
+        return trace
+
+    if cache_dir is None:
+        trace = parse_trace(csv_path)
+        trace.setflags(write=False)
+    else:
+        npy_path = os.path.join(cache_dir, key + '.npy')
+        if not os.path.exists(npy_path):
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = npy_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.save(f, parse_trace(csv_path))
+            os.replace(tmp_path, npy_path)
+        trace = np.load(npy_path, mmap_mode='r')
+
+    _TRACE_CACHE[key] = trace
+    return trace
+
+
+def trace_digest(trace):
+    """변화량 배열 내용의 sha1 해시 (시나리오 뱅크의 시나리오 하나를 평가 캐시 키로 쓸 때)"""
+    return hashlib.sha1(np.ascontiguousarray(trace, dtype=np.float64).tobytes()).hexdigest()
+
+
+def load_bank(bank_path):
+    """
+    scenario_waterpark.generate_bank로 만든 시나리오 뱅크(.npy)를 memory-map으로 열기
+
+    Returns:
+        ndarray: (scenarios, steps, 3) 읽기 전용 변화량 배열 (인덱싱한 시나리오만 디스크에서 읽음)
+    """
+    bank = np.load(bank_path, mmap_mode='r')
+    if bank.ndim != 3 or bank.shape[2] != len(TRACE_COLUMNS):
+        raise ValueError(f"시나리오 뱅크 shape이 (scenarios, steps, {len(TRACE_COLUMNS)})가 아님: {bank.shape}")
+    return bank
@@ -1,55 +1,197 @@
+import json
+import os
+from time import perf_counter
+
 import numpy as np
-import matplotlib.pyplot as plt
 
 from env_waterpark import WaterParkEnv
-from agent_waterpark import QAgent, FixedIntervalPolicy, quantize_state
+from agent_waterpark import QAgent, FixedIntervalPolicy, quantize_state, quantize_states
+from metrics_waterpark import MetricsSink, plot_logs
+from convergence_waterpark import ConvergenceMonitor
+
+def save_checkpoint(agent, env, checkpoint):
+    """
+    agent 체크포인트(path.npy + path.json) + 환경 상태(path.env.json: 난수 스트림 등)
+    -> 확률 환경도 이어서 학습한 결과가 중단 없이 학습한 결과와 같음.
+    환경 상태를 먼저 쓰고 agent .json을 마지막에 교체 (.json 변경 = 저장 완료).
+    """
+    os.makedirs(os.path.dirname(checkpoint) or '.', exist_ok=True)
+    env_state = env.checkpoint_state() if hasattr(env, 'checkpoint_state') else {}
+    with open(checkpoint + '.env.json.tmp', 'w') as f:
+        json.dump(env_state, f)
+    os.replace(checkpoint + '.env.json.tmp', checkpoint + '.env.json')
+    agent.save(checkpoint)
 
-def run_policy_full(env, policy, quantize=False, episodes=5000):
+def resume_checkpoint(agent, checkpoint, env=None, verbose=True):
+    """
+    체크포인트가 있으면 agent(와 env 상태)에 불러오고 이어서 시작할 에피소드 번호를 반환
+    (verbose=False: 출력 없음, 워커 프로세스에서 호출할 때는 결과를 부모가 출력)
+    """
+    if checkpoint is None or not os.path.exists(checkpoint + '.json'):
+        return 0
+    agent.restore(checkpoint)
+    if env is not None and hasattr(env, 'restore_state') and os.path.exists(checkpoint + '.env.json'):
+        with open(checkpoint + '.env.json') as f:
+            env.restore_state(json.load(f))
+    if verbose:
+        print(f"Resume: {checkpoint} (episode {agent.episodes})")
+    return agent.episodes
+
+# metrics(MetricsSink)를 넘기면 에피소드 결과를 리스트 대신 sink에 기록하고 sink를 반환
+# recorder(TrajectoryRecorder)를 넘기면 모든 전이를 바이너리 로그에 기록
+def run_policy_full(env, policy, quantize=False, episodes=5000, metrics=None, recorder=None):
     total_rewards, replace_counts, safeties = [], [], []
+    buf = np.empty(5)  # step마다 상태를 덮어쓰는 버퍼
+    quantize_fn = getattr(policy, 'quantize_state', quantize_state)  # 정책의 bin_edges로 양자화 (없으면 기본 구간)
     for ep in range(episodes):
-        state = env.reset()
+        state = env.reset(out=buf)
+        if recorder is not None:
+            recorder.start(state)
         rewards = 0
         done = False
         safe = True
         while not done:
-            s = quantize_state(state) if quantize else state
+            s = quantize_fn(state) if quantize else state
             action = policy.choose_action(s)
-            state, reward, done, info = env.step(action)
+            state, reward, done, info = env.step(action, out=buf)
+            if recorder is not None:
+                recorder.step(action, reward, state, done)
             rewards += reward
             if state[0] > 0.5 or state[1] > 2.8 or state[2] < 5.8 or state[2] > 8.6:
                 safe = False
         # 에피소드 종료 후 남은 교체 횟수에 따른 추가 보상
         bonus = 0.2 * state[3]
         rewards += bonus
-        total_rewards.append(rewards)
-        replace_counts.append(env.replace_count)
-        safeties.append(safe)
+        if metrics is not None:
+            metrics.record(rewards, env.replace_count, safe)
+        else:
+            total_rewards.append(rewards)
+            replace_counts.append(env.replace_count)
+            safeties.append(safe)
+    if recorder is not None:
+        recorder.flush()
+    if metrics is not None:
+        metrics.flush()
+        return metrics
     return total_rewards, replace_counts, safeties
 
-def train_qlearning_full(env, agent, episodes=5000):
+# profiler(PhaseProfiler)를 넘기면 구간별 시간/호출 수를 누적하고 처리량을 주기적으로 출력
+# checkpoint 경로를 주면 checkpoint_every 에피소드마다 저장, resume=True면 저장된 지점부터 이어서 학습
+# convergence(ConvergenceMonitor)를 넘기면 수렴 판정 시 episodes 전에 학습 중단
+# recorder: run_policy_full과 동일
+def train_qlearning_full(env, agent, episodes=5000, metrics=None, profiler=None,
+                         checkpoint=None, checkpoint_every=1000, resume=False, convergence=None, recorder=None):
     rewards, replaces, safeties = [], [], []
-    for ep in range(episodes):
-        state = env.reset()
-        state_disc = quantize_state(state)
+    buf = np.empty(5)  # step마다 상태를 덮어쓰는 버퍼
+    timed = profiler is not None
+    t = 0.0
+    first = resume_checkpoint(agent, checkpoint, env) if resume else 0
+    quantize = agent.quantize_state  # 에이전트별 상태 양자화 (bin_edges / sparse 키)
+    end_episode = getattr(agent, 'end_episode', None)  # 에피소드 경계 처리 (QLambdaAgent: trace 초기화)
+    if convergence is not None:
+        convergence.start(agent)
+    for ep in range(first, episodes):
+        state = env.reset(out=buf)
+        if recorder is not None:
+            recorder.start(state)
+        state_disc = quantize(state)
         done = False
         total_reward = 0
         safe = True
+        n_steps = 0
         while not done:
+            if timed:
+                t = perf_counter()
             action = agent.choose_action(state_disc)
-            next_state, reward, done, info = env.step(action)
-            next_state_disc = quantize_state(next_state)
+            if timed:
+                t = profiler.add('choose_action', t)
+            next_state, reward, done, info = env.step(action, out=buf)
+            if timed:
+                t = profiler.add('env.step', t)
+            if recorder is not None:
+                recorder.step(action, reward, next_state, done)
+            next_state_disc = quantize(next_state)
+            if timed:
+                t = profiler.add('quantize_state', t)
             agent.learn(state_disc, action, reward, next_state_disc)
+            if timed:
+                t = profiler.add('learn', t)
             state_disc = next_state_disc
             state = next_state
             total_reward += reward
+            n_steps += 1
             if state[0] > 0.5 or state[1] > 2.8 or state[2] < 5.8 or state[2] > 8.6:
                 safe = False
+            if timed:
+                profiler.add('safety_check', t)
         # 에피소드 종료 후 남은 교체 횟수에 따른 추가 보상
         bonus = 0.2 * state[3]
         total_reward += bonus
-        rewards.append(total_reward)
-        replaces.append(env.replace_count)
-        safeties.append(safe)
+        if metrics is not None:
+            metrics.record(total_reward, env.replace_count, safe)
+        else:
+            rewards.append(total_reward)
+            replaces.append(env.replace_count)
+            safeties.append(safe)
+        if end_episode is not None:
+            end_episode()
+        agent.decay_epsilon()
+        agent.episodes += 1
+        if checkpoint is not None and (ep+1) % checkpoint_every == 0:
+            save_checkpoint(agent, env, checkpoint)
+        if timed:
+            profiler.episode_end(n_steps, agent.epsilon)
+        elif (ep+1) % 100 == 0:
+            if metrics is not None:
+                summary = metrics.summary()
+                print(f"Episode {ep+1} / Epsilon: {agent.epsilon:.4f} / Reward: {summary['reward_mean']:.2f} / Safety: {summary['safety_rate']:.2f}")
+            else:
+                print(f"Episode {ep+1} / Epsilon: {agent.epsilon:.4f}")
+        if convergence is not None and convergence.update(agent, total_reward):
+            print(f"Converged: episode {ep+1}")
+            break
+    if checkpoint is not None:
+        save_checkpoint(agent, env, checkpoint)
+    if recorder is not None:
+        recorder.flush()
+    if metrics is not None:
+        metrics.flush()
+        return metrics
+    return rewards, replaces, safeties
+
+def train_qlearning_batched(env, agent, episodes=5000):
+    """
+    VectorWaterParkEnv(n_envs=K) + BatchedQAgent(K)로 K개 에이전트를 동시에 학습.
+    환경 i는 에이전트 i 전용이며, 모든 에피소드 길이가 같아 에피소드 경계가 맞춰짐.
+
+    Returns:
+        rewards, replaces, safeties: (episodes, K) 배열
+    """
+    K = agent.n_agents
+    rewards = np.zeros((episodes, K))
+    replaces = np.zeros((episodes, K), dtype=np.int64)
+    safeties = np.zeros((episodes, K), dtype=bool)
+    states = env.reset()
+    state_disc = quantize_states(states)
+    for ep in range(episodes):
+        total_reward = np.zeros(K)
+        safe = np.ones(K, dtype=bool)
+        done = False
+        while not done:
+            actions = agent.choose_action(state_disc)
+            states, reward, dones, infos = env.step(actions)
+            final_states = infos['final_state']
+            next_state_disc = quantize_states(final_states)
+            agent.learn(state_disc, actions, reward, next_state_disc)
+            state_disc = quantize_states(states) if dones.any() else next_state_disc
+            total_reward += reward
+            safe &= ~((final_states[:, 0] > 0.5) | (final_states[:, 1] > 2.8)
+                      | (final_states[:, 2] < 5.8) | (final_states[:, 2] > 8.6))
+            done = dones.all()
+        # 에피소드 종료 후 남은 교체 횟수에 따른 추가 보상
+        rewards[ep] = total_reward + 0.2 * final_states[:, 3]
+        replaces[ep] = infos['replace_count']
+        safeties[ep] = safe
         agent.decay_epsilon()
         if (ep+1) % 100 == 0:
             print(f"Episode {ep+1} / Epsilon: {agent.epsilon:.4f}")
@@ -59,43 +201,33 @@ def moving_average(data, window=50):
     return np.convolve(data, np.ones(window)/window, mode='valid')
 
 if __name__ == "__main__":
-    env = WaterParkEnv()
+    env = WaterParkEnv(return_info=False)
 
     # Q-러닝 학습, epsilon 0.1로 시작, decay로 점차 감소
     q_agent = QAgent(epsilon=0.1, epsilon_decay=0.9995, epsilon_min=0.001)
     fixed_policy = FixedIntervalPolicy()
 
+    # 에피소드 결과는 logs/*.csv로 흘려 쓰고, 그래프는 로그에서 파일로 렌더링
+    logs = {
+        "Fixed Policy": "logs/fixed.csv",
+        "Q-Learning": "logs/qlearning.csv",
+        "Greedy Policy": "logs/greedy.csv",
+    }
+
     # Fixed Policy
-    fixed_rewards, fixed_replace, fixed_safety = run_policy_full(env, fixed_policy, quantize=False, episodes=10000)
+    with MetricsSink(logs["Fixed Policy"]) as sink:
+        run_policy_full(env, fixed_policy, quantize=False, episodes=10000, metrics=sink)
 
-    # Q-Learning
-    q_rewards, q_replace, q_safety = train_qlearning_full(env, q_agent, episodes=10000)
+    # Q-Learning (수렴하면 10000 에피소드 전에 중단)
+    monitor = ConvergenceMonitor(window=200)
+    with MetricsSink(logs["Q-Learning"]) as sink:
+        train_qlearning_full(env, q_agent, episodes=10000, metrics=sink, checkpoint="checkpoints/waterpark_q",
+                             convergence=monitor)
 
     # Greedy Policy 평가 (epsilon=0)
-    class GreedyQPolicy:
-        def choose_action(self, state):
-            return np.argmax(q_agent.Q_table[state])
-    greedy_rewards, greedy_replace, greedy_safety = run_policy_full(env, GreedyQPolicy(), quantize=True, episodes=10000)
-
-    plt.figure(figsize=(14, 5))
-
-    # 전체 리워드(왼쪽)
-    plt.subplot(1, 2, 1)
-    plt.plot(moving_average(fixed_rewards), label="Fixed Policy")
-    plt.plot(moving_average(q_rewards), label="Q-Learning")
-    plt.plot(moving_average(greedy_rewards), label="Greedy Policy")
-    plt.title("Policy Performance Comparison")
-    plt.ylabel("Mean Total Reward (Moving Average)")
-    plt.legend()
-
-    # 자원 소모량(오른쪽)
-    plt.subplot(1, 2, 2)
-    plt.plot(moving_average(fixed_replace), label="Fixed Policy")
-    plt.plot(moving_average(q_replace), label="Q-Learning")
-    plt.plot(moving_average(greedy_replace), label="Greedy Policy")
-    plt.title("Resource Usage Comparison")
-    plt.ylabel("Water Replacement Count (Moving Average)")
-    plt.legend()
-
-    plt.tight_layout()
-    plt.show()
+    with MetricsSink(logs["Greedy Policy"]) as sink:
+        run_policy_full(env, q_agent.greedy_policy(), quantize=True, episodes=10000, metrics=sink)
+
+    # 전체 리워드(왼쪽) / 자원 소모량(오른쪽)
+    plot_logs(logs, "policy_comparison.png")
+    print("그래프 저장: policy_comparison.png")
@@ -1,16 +1,13 @@
+from time import perf_counter
+
 import numpy as np
 import matplotlib.pyplot as plt
 
 from env_waterpark_fixed import WaterParkEnv
-from agent_waterpark import QAgent, FixedIntervalPolicy, quantize_state
-
-# 그리디 정책 클래스 (학습된 Q-table에서 가장 큰 값 선택)
-class GreedyPolicy:
-    def __init__(self, q_table):
-        self.q_table = q_table
-
-    def choose_action(self, state):
-        return np.argmax(self.q_table[state])
+from agent_waterpark import QAgent, FixedIntervalPolicy, SchedulePolicy, quantize_state
+from solver_waterpark import solve_optimal
+from train_waterpark import resume_checkpoint, save_checkpoint
+from evaluation_waterpark import PolicyEvaluator
 
 # 실험에 사용하는 환경 목록
 CSV_LIST = [
@@ -31,16 +28,18 @@ ENV_LABELS = [
 # 주어진 정책을 그대로 실행하여 성능 계산
 def run_policy(env, policy, quantize, episodes):
     total_rewards, replace_counts = [], []
+    buf = np.empty(5)  # step마다 상태를 덮어쓰는 버퍼
+    quantize_fn = getattr(policy, 'quantize_state', quantize_state)  # 정책의 bin_edges로 양자화 (없으면 기본 구간)
 
     for ep in range(episodes):
-        state = env.reset()
+        state = env.reset(out=buf)
         done = False
         total_reward = 0
 
         while not done:
-            s = quantize_state(state) if quantize else state
+            s = quantize_fn(state) if quantize else state
             action = policy.choose_action(s)
-            state, reward, done, _ = env.step(action)
+            state, reward, done, _ = env.step(action, out=buf)
             total_reward += reward
 
         # 남은 교체 횟수 보너스 추가
@@ -50,33 +49,69 @@ def run_policy(env, policy, quantize, episodes):
 
     return total_rewards, replace_counts
 
-# Q-Learning 기반 학습
-def train_qlearning(env, agent, episodes):
-    rewards, replaces = [], []
+# 결정론적인 (환경, 정책) 평가는 1 에피소드만 실행하고 캐시
+evaluator = PolicyEvaluator(run_policy)
 
-    for ep in range(episodes):
-        state = env.reset()
-        state_disc = quantize_state(state)
+# Q-Learning 기반 학습 (profiler: PhaseProfiler, 구간별 시간 측정용)
+# checkpoint/resume/convergence: train_waterpark.train_qlearning_full과 동일 (verbose=False면 resume 메시지 출력 X)
+def train_qlearning(env, agent, episodes, profiler=None, checkpoint=None, checkpoint_every=1000, resume=False,
+                    convergence=None, verbose=True):
+    rewards, replaces = [], []
+    buf = np.empty(5)  # step마다 상태를 덮어쓰는 버퍼
+    timed = profiler is not None
+    t = 0.0
+    first = resume_checkpoint(agent, checkpoint, env, verbose) if resume else 0
+    quantize = agent.quantize_state  # 에이전트별 상태 양자화 (bin_edges / sparse 키)
+    end_episode = getattr(agent, 'end_episode', None)  # 에피소드 경계 처리 (QLambdaAgent: trace 초기화)
+    if convergence is not None:
+        convergence.start(agent)
+
+    for ep in range(first, episodes):
+        state = env.reset(out=buf)
+        state_disc = quantize(state)
         total_reward = 0
         done = False
+        n_steps = 0
 
         while not done:
+            if timed:
+                t = perf_counter()
             action = agent.choose_action(state_disc)
-            next_state, reward, done, _ = env.step(action)
-            next_state_disc = quantize_state(next_state)
+            if timed:
+                t = profiler.add('choose_action', t)
+            next_state, reward, done, _ = env.step(action, out=buf)
+            if timed:
+                t = profiler.add('env.step', t)
+            next_state_disc = quantize(next_state)
+            if timed:
+                t = profiler.add('quantize_state', t)
 
             # Q-table 업데이트
             agent.learn(state_disc, action, reward, next_state_disc)
+            if timed:
+                profiler.add('learn', t)
 
             total_reward += reward
             state_disc = next_state_disc
             state = next_state
+            n_steps += 1
 
         total_reward += 0.1 * state[3]
         rewards.append(total_reward)
         replaces.append(env.replace_count)
+        if end_episode is not None:
+            end_episode()
         agent.decay_epsilon()
-
+        agent.episodes += 1
+        if checkpoint is not None and (ep+1) % checkpoint_every == 0:
+            save_checkpoint(agent, env, checkpoint)
+        if timed:
+            profiler.episode_end(n_steps, agent.epsilon)
+        if convergence is not None and convergence.update(agent, total_reward):
+            break
+
+    if checkpoint is not None:
+        save_checkpoint(agent, env, checkpoint)
     return rewards, replaces
 
 # 이동 평균 계산 (그래프 smooth 처리용)
@@ -89,20 +124,26 @@ if __name__ == "__main__":
 
     # 환경 수 만큼 subplot 구성 (4개 환경 x 2열)
     fig, axes = plt.subplots(nrows=4, ncols=2, figsize=(14, 16))
-    fig.suptitle("Q-Learning vs Fixed vs Greedy - Across 4 Fixed Environments", fontsize=16)
+    fig.suptitle("Q-Learning vs Fixed vs Greedy vs Optimal - Across 4 Fixed Environments", fontsize=16)
 
     for idx, csv_file in enumerate(CSV_LIST):
         print(f"▶ 실험 환경: {csv_file}")
 
-        env = WaterParkEnv(csv_file)
+        env = WaterParkEnv(csv_file, return_info=False)
         q_agent = QAgent(epsilon=0.1, epsilon_decay=0.9995, epsilon_min=0.01)
         fixed_policy = FixedIntervalPolicy()
-        greedy_policy = GreedyPolicy(q_agent.Q_table)
 
         # 학습 및 정책 평가
         q_rewards, q_replaces = train_qlearning(env, q_agent, episodes)
-        greedy_rewards, greedy_replaces = run_policy(env, greedy_policy, quantize=True, episodes=episodes)
-        fixed_rewards, fixed_replaces = run_policy(env, fixed_policy, quantize=False, episodes=episodes)
+        # 그리디 정책: 학습된 Q-table에서 가장 큰 값의 행동을 고정
+        greedy_policy = q_agent.greedy_policy()
+        greedy_rewards, greedy_replaces = evaluator.evaluate(env, greedy_policy, quantize=True, episodes=episodes)
+        fixed_rewards, fixed_replaces = evaluator.evaluate(env, fixed_policy, quantize=False, episodes=episodes)
+
+        # 최적 스케줄 (결정론적 환경 -> 1 에피소드로 충분)
+        optimal_value, optimal_schedule = solve_optimal(env)
+        optimal_rewards, optimal_replaces = evaluator.evaluate(env, SchedulePolicy(optimal_schedule), quantize=False, episodes=1)
+        print(f"  최적 보상: {optimal_value:.2f} / 교체 횟수: {optimal_replaces[0]}")
 
         row = idx
 
@@ -112,6 +153,7 @@ if __name__ == "__main__":
         ax1.plot(moving_average(fixed_rewards), label="Fixed")
         ax1.plot(moving_average(q_rewards), label="Q-Learning")
         ax1.plot(moving_average(greedy_rewards), label="Greedy")
+        ax1.axhline(optimal_rewards[0], color="k", linestyle="--", label="Optimal")
         if row == 0:
             ax1.legend()
         ax1.set_ylabel("Reward")
@@ -122,6 +164,7 @@ if __name__ == "__main__":
         ax2.plot(moving_average(fixed_replaces), label="Fixed")
         ax2.plot(moving_average(q_replaces), label="Q-Learning")
         ax2.plot(moving_average(greedy_replaces), label="Greedy")
+        ax2.axhline(optimal_replaces[0], color="k", linestyle="--", label="Optimal")
         if row == 0:
             ax2.legend()
         ax2.set_ylabel("Water Replacements")
@@ -0,0 +1,199 @@
+import os
+
+import numpy as np
+
+from agent_waterpark import QAgent, quantize_states
+
+# 전이 한 개 = 레코드 한 개 (고정 크기, 헤더 없는 바이너리 파일에 이어 붙임)
+TRANSITION_DTYPE = np.dtype([
+    ('episode', np.int32),
+    ('state', np.float32, (5,)),       # [ammonia, turbidity, pH, replace_left, step]
+    ('action', np.int8),
+    ('reward', np.float32),
+    ('next_state', np.float32, (5,)),
+    ('done', np.bool_),
+])
+
+
+class TrajectoryRecorder:
+    """
+    전이를 chunk_size개씩 모아 TRANSITION_DTYPE 레코드 파일 끝에 이어 씀 (append-only).
+    학습/평가 루프에서는 reset 직후 start(state), step 직후 step(action, reward, next_state, done) 호출
+    -> 상태 버퍼를 재사용하는 루프에서도 이전 상태는 recorder가 따로 복사해 둠.
+    """
+
+    def __init__(self, path, chunk_size=4096):
+        """
+        Args:
+            path (str): 레코드 파일 경로 (이미 있으면 뒤에 이어 씀, 에피소드 번호도 이어서 매김, 잘린 마지막 레코드는 삭제)
+            chunk_size (int): 몇 개의 전이를 모아서 파일에 쓸지
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        existing = load_trajectories(path) if os.path.exists(path) else None
+        self.episode = int(existing['episode'][-1]) + 1 if existing is not None and len(existing) else 0
+        self.count = len(existing) if existing is not None else 0
+        del existing
+        if self.count * TRANSITION_DTYPE.itemsize < (os.path.getsize(path) if os.path.exists(path) else 0):
+            # 쓰다 중단돼 잘린 마지막 레코드는 버림 (그대로 이어 쓰면 이후 레코드가 모두 어긋남)
+            os.truncate(path, self.count * TRANSITION_DTYPE.itemsize)
+        self._chunk = np.zeros(chunk_size, dtype=TRANSITION_DTYPE)
+        self._n = 0
+        self._state = np.zeros(5, dtype=np.float32)
+        self._file = open(path, 'ab')
+
+    def start(self, state):
+        """에피소드 시작 상태"""
+        self._state[:] = state
+
+    def step(self, action, reward, next_state, done):
+        row = self._chunk[self._n]
+        row['episode'] = self.episode
+        row['state'] = self._state
+        row['action'] = action
+        row['reward'] = reward
+        row['next_state'] = next_state
+        row['done'] = done
+        self._state[:] = next_state
+        self._n += 1
+        self.count += 1
+        if done:
+            self.episode += 1
+        if self._n == len(self._chunk):
+            self.flush()
+
+    def record_batch(self, states, actions, rewards, next_states, dones, episodes=None):
+        """
+        이미 모아둔 전이 배열(운영 로그 등)을 한 번에 추가
+
+        Args:
+            episodes (ndarray): 전이별 에피소드 번호 (None이면 dones로 구분해서 이어서 매김)
+        """
+        dones = np.asarray(dones, dtype=bool)
+        records = np.zeros(len(dones), dtype=TRANSITION_DTYPE)
+        if episodes is None:
+            # 각 전이 이전에 끝난 에피소드 수만큼 번호 증가
+            episodes = self.episode + np.concatenate([[0], np.cumsum(dones)[:-1]]) if len(dones) else []
+            self.episode += int(dones.sum())
+        records['episode'] = episodes
+        records['state'] = states
+        records['action'] = actions
+        records['reward'] = rewards
+        records['next_state'] = next_states
+        records['done'] = dones
+        self.flush()
+        self._file.write(records.tobytes())
+        self.count += len(records)
+
+    def flush(self):
+        if self._n:
+            self._file.write(self._chunk[:self._n].tobytes())
+            self._n = 0
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_trajectories(path, mode='r'):
+    """
+    레코드 파일을 memory-map으로 열기 (복사 없음, 파일이 커도 필요한 부분만 읽음)
+
+    Returns:
+        ndarray: TRANSITION_DTYPE 레코드 배열 (비어 있으면 길이 0 배열)
+    """
+    size = os.path.getsize(path)
+    if size < TRANSITION_DTYPE.itemsize:
+        return np.zeros(0, dtype=TRANSITION_DTYPE)
+    # 쓰는 중이라 마지막 레코드가 잘렸으면 완성된 레코드까지만
+    return np.memmap(path, dtype=TRANSITION_DTYPE, mode=mode, shape=(size // TRANSITION_DTYPE.itemsize,))
+
+
+def _quantized(data, bin_edges, chunk_size):
+    # 상태를 chunk_size개씩 읽어서 flat index로 변환 (전체 float 배열을 한 번에 만들지 않음)
+    n = len(data)
+    states = np.empty(n, dtype=np.intp)
+    next_states = np.empty(n, dtype=np.intp)
+    for start in range(0, n, chunk_size):
+        chunk = data[start:start + chunk_size]
+        states[start:start + len(chunk)] = quantize_states(chunk['state'], bin_edges)
+        next_states[start:start + len(chunk)] = quantize_states(chunk['next_state'], bin_edges)
+    return states, next_states
+
+
+def fitted_q_iteration(data, agent=None, n_iterations=100, gamma=None, tol=1e-6, chunk_size=1 << 16):
+    """
+    저장된 전이로 표 형식 fitted-Q iteration (전이를 다시 시뮬레이션하지 않음).
+    매 반복마다 모든 (상태, 행동)의 Q를 r + gamma * max Q(다음 상태)의 평균으로 한꺼번에 갱신
+    (= 로그로 만든 경험적 MDP의 가치 반복). 로그에 없는 (상태, 행동)은 기존 값 유지.
+
+    Args:
+        data: load_trajectories 결과 (또는 같은 필드를 가진 레코드 배열)
+        agent (QAgent): 결과를 넣을 에이전트 (None이면 새로 만듦, bin_edges/gamma 사용)
+        n_iterations (int): 최대 반복 수
+        gamma (float): 할인율 (None이면 agent.gamma)
+        tol (float): Q 변화량 최댓값이 이보다 작으면 중단
+
+    Returns:
+        QAgent: Q_table이 채워진 에이전트 (greedy_policy / save 사용 가능)
+    """
+    agent = QAgent(epsilon=0.0) if agent is None else agent
+    gamma = agent.gamma if gamma is None else gamma
+    n_actions = agent.n_actions
+    q = agent.Q_table.reshape(-1, n_actions)
+    states, next_states = _quantized(data, agent.bin_edges, chunk_size)
+    actions = np.asarray(data['action'], dtype=np.intp)
+    rewards = np.asarray(data['reward'], dtype=np.float64)
+    continues = ~np.asarray(data['done'])  # 종료 전이는 다음 상태 가치 0
+
+    cells = states * n_actions + actions
+    counts = np.bincount(cells, minlength=q.size)
+    visited = counts > 0
+    reward_mean = np.bincount(cells, weights=rewards, minlength=q.size)[visited] / counts[visited]
+    for _ in range(n_iterations):
+        best_next = np.where(continues, q.max(axis=1)[next_states], 0.0)
+        target = reward_mean + gamma * np.bincount(cells, weights=best_next, minlength=q.size)[visited] / counts[visited]
+        flat = q.reshape(-1)
+        delta = np.abs(flat[visited] - target).max() if len(target) else 0.0
+        flat[visited] = target
+        if delta < tol:
+            break
+    return agent
+
+
+def batch_q_learning(data, agent, sweeps=10, batch_size=4096, seed=None, chunk_size=1 << 16):
+    """
+    저장된 전이를 sweeps번 섞어서 돌며 미니배치 Q-러닝 업데이트.
+    QAgent는 Q_table에 벡터화한 TD 업데이트(np.add.at), learn_batch가 있는 에이전트(LinearQAgent)는 원본 상태로 learn_batch 호출.
+
+    Returns:
+        agent
+    """
+    rng = np.random.default_rng(seed)
+    actions = np.asarray(data['action'], dtype=np.intp)
+    rewards = np.asarray(data['reward'], dtype=np.float64)
+    continues = ~np.asarray(data['done'])
+    tabular = not hasattr(agent, 'learn_batch')
+    if tabular:
+        states, next_states = _quantized(data, agent.bin_edges, chunk_size)
+        q = agent.Q_table.reshape(-1, agent.n_actions)
+    for _ in range(sweeps):
+        order = rng.permutation(len(actions))
+        for start in range(0, len(order), batch_size):
+            idx = np.sort(order[start:start + batch_size])  # memmap에서 순서대로 읽도록 정렬
+            if tabular:
+                s, a = states[idx], actions[idx]
+                target = rewards[idx] + agent.gamma * np.where(continues[idx], q[next_states[idx]].max(axis=1), 0.0)
+                np.add.at(q, (s, a), agent.alpha * (target - q[s, a]) / np.bincount(s * agent.n_actions + a)[s * agent.n_actions + a])
+            else:
+                batch = data[idx]
+                agent.learn_batch(batch['state'], actions[idx], rewards[idx], batch['next_state'], ~continues[idx])
+    return agent